@@ -2,9 +2,64 @@
 #  Software License, (See accompanying file LICENSE or copy at
 #  https://www.gnu.org/licenses/gpl-3.0.txt)
 
+import atexit
 import os
 from pathlib import Path
+import platform
 import tempfile
+import threading
+
+PYTHON_ORACLE = 'python'  # Use this value as solve_sudoku_path to run the in-process oracle of competitive_sudoku.oracle
+SERVER_ORACLE = 'server'  # Use this value as solve_sudoku_path to run the in-process oracle in a long-lived server
+ORACLE_ADDRESS_PREFIX = 'oracle-server://'  # The prefix of the address of an oracle server, see start_oracle_server
+
+_oracle_servers = {}  # The address of the oracle server that was started by every process, see start_oracle_server
+_oracle_clients = threading.local()  # The connections of every thread to oracle servers, see oracle_client
+
+
+def default_solve_sudoku_path() -> str:
+    """
+    Gets the location of the solve_sudoku executable in the bin folder. If there is no executable for this platform,
+    the in-process oracle is used.
+    @return: The location of the executable, or PYTHON_ORACLE.
+    """
+    solve_sudoku_path = 'bin\\solve_sudoku.exe' if platform.system() == 'Windows' else 'bin/solve_sudoku'
+    return solve_sudoku_path if os.path.exists(solve_sudoku_path) else PYTHON_ORACLE
+
+
+def start_oracle_server(solve_sudoku_path: str) -> str:
+    """
+    Starts an oracle server if solve_sudoku_path is SERVER_ORACLE. The server hosts the in-process oracle. It is started
+    once per process, and stopped when the process exits. The address of the server can be used as solve_sudoku_path
+    by any process, which is how the game simulators share one server with all player processes.
+    @param solve_sudoku_path: The location of the solve_sudoku executable, or PYTHON_ORACLE or SERVER_ORACLE.
+    @return: The address of the server, or solve_sudoku_path if it is not SERVER_ORACLE.
+    """
+    if solve_sudoku_path != SERVER_ORACLE:
+        return solve_sudoku_path
+    pid = os.getpid()
+    if pid not in _oracle_servers:
+        from competitive_sudoku.oracle_server import OracleServer
+        server = OracleServer()
+        _oracle_servers[pid] = server.start()
+        atexit.register(server.close)
+    return _oracle_servers[pid]
+
+
+def oracle_client(address: str):
+    """
+    Gets the connection of the calling thread to an oracle server.
+    @param address: The address of the server, see start_oracle_server.
+    @return: An instance of competitive_sudoku.oracle_server.OracleClient.
+    """
+    # A forked process inherits the connections of its parent, but must not share them
+    if getattr(_oracle_clients, 'pid', None) != os.getpid():
+        _oracle_clients.connections = {}
+        _oracle_clients.pid = os.getpid()
+    if address not in _oracle_clients.connections:
+        from competitive_sudoku.oracle_server import OracleClient
+        _oracle_clients.connections[address] = OracleClient(address)
+    return _oracle_clients.connections[address]
 
 
 def execute_command(command: str) -> str:
@@ -19,14 +74,24 @@ def execute_command(command: str) -> str:
 def solve_sudoku(solve_sudoku_path: str, board_text: str, options: str='') -> str:
     """
     Execute the solve_sudoku program.
-    @param solve_sudoku_path: The location of the solve_sudoku executable.
+    @param solve_sudoku_path: The location of the solve_sudoku executable, PYTHON_ORACLE, SERVER_ORACLE, or the address
+    of an oracle server.
     @param board_text: A string representation of a sudoku board.
     @param options: Additional command line options.
     @return: The output of solve_sudoku.
     """
+    if solve_sudoku_path == PYTHON_ORACLE:
+        from competitive_sudoku.oracle import solve_sudoku as solve_sudoku_in_process
+        return solve_sudoku_in_process(board_text, options)
+    solve_sudoku_path = start_oracle_server(solve_sudoku_path)
+    if solve_sudoku_path.startswith(ORACLE_ADDRESS_PREFIX):
+        return oracle_client(solve_sudoku_path).solve_sudoku(board_text, options)
     if not os.path.exists(solve_sudoku_path):
         raise RuntimeError(f'No oracle found at location "{solve_sudoku_path}"')
     filename = tempfile.NamedTemporaryFile(prefix='solve_sudoku_').name
     Path(filename).write_text(board_text)
-    command = f'{solve_sudoku_path} {filename} {options}'
-    return execute_command(command)
+    try:
+        command = f'{solve_sudoku_path} {filename} {options}'
+        return execute_command(command)
+    finally:
+        os.remove(filename)
@@ -0,0 +1,128 @@
+"""
+A compact record of a game, such that games can be analysed and re-scored without running the AIs again. Records are
+stored as JSON lines, with one game per line:
+
+    {"board": "2 2 1 2 . 4 ...", "first": "team37_A2", "second": "greedy_player", "time": 0.5, "seed": 12345,
+     "moves": [[i, j, value, taboo, score, think_time], ...], "result": [s1, s2]}
+
+The moves are in the order in which they were proposed. A taboo move has taboo flag 1 and does not change the board.
+The result is either the final scores, or a string that describes the mistake that ended the game; in that case the
+last move is the mistake, and a player that was too slow has move (0, 0, 0).
+"""
+
+import json
+from typing import Iterator, Optional
+from competitive_sudoku.referee import judge_move
+from competitive_sudoku.sudoku import GameState, Move, SudokuBoard, load_sudoku_from_text
+
+
+class GameRecord(object):
+    """
+    The record of a single game.
+    """
+
+    def __init__(self, board: SudokuBoard, first: str = '', second: str = '', calculation_time: float = 0.0, seed: Optional[int] = None):
+        """
+        @param board: The initial position of the game.
+        @param first: The module name of the first player.
+        @param second: The module name of the second player.
+        @param calculation_time: The amount of time in seconds for computing a move.
+        @param seed: The seed of the random generators of the players.
+        """
+        self.board = ' '.join(str(board).split())
+        self.first = first
+        self.second = second
+        self.calculation_time = calculation_time
+        self.seed = seed
+        self.moves = []
+        self.result = None
+
+    def add_move(self, i: int, j: int, value: int, taboo: bool, score: int, think_time: float) -> None:
+        """
+        Appends a move to the record.
+        @param i: The row of the move.
+        @param j: The column of the move.
+        @param value: The value of the move.
+        @param taboo: True if the move turned out to be a taboo move.
+        @param score: The reward of the move.
+        @param think_time: The time in seconds the player used for the move.
+        """
+        self.moves.append([i, j, value, int(taboo), score, round(think_time, 4)])
+
+    def initial_board(self) -> SudokuBoard:
+        """
+        @return: The initial position of the game.
+        """
+        return load_sudoku_from_text(self.board)
+
+    def to_json(self) -> str:
+        """
+        @return: The record as a single line of JSON.
+        """
+        return json.dumps({'board': self.board, 'first': self.first, 'second': self.second, 'time': self.calculation_time,
+                           'seed': self.seed, 'moves': self.moves, 'result': self.result}, separators=(',', ':'))
+
+    @staticmethod
+    def from_json(text: str) -> 'GameRecord':
+        """
+        Parses a record that was written by to_json.
+        @param text: A line of JSON.
+        @return: The record.
+        """
+        data = json.loads(text)
+        record = GameRecord(load_sudoku_from_text(data['board']), data.get('first', ''), data.get('second', ''),
+                            data.get('time', 0.0), data.get('seed'))
+        record.moves = data['moves']
+        record.result = data.get('result')
+        return record
+
+
+def write_record(filename: str, record: GameRecord) -> None:
+    """
+    Appends a record to a file.
+    @param filename: The name of a JSON lines file.
+    @param record: A game record.
+    """
+    with open(filename, 'a') as f:
+        f.write(record.to_json() + '\n')
+
+
+def read_records(filename: str) -> Iterator[GameRecord]:
+    """
+    Reads the records of a file.
+    @param filename: The name of a JSON lines file.
+    @return: The records in the file, in order.
+    """
+    with open(filename) as f:
+        for line in f:
+            if line.strip():
+                yield GameRecord.from_json(line)
+
+
+def replay(record: GameRecord, solve_sudoku_path: str) -> GameRecord:
+    """
+    Plays the moves of a record again, and checks and scores them with the oracle. The AIs are not used.
+    @param record: A game record.
+    @param solve_sudoku_path: The location of the oracle.
+    @return: A new record with the taboo flags, scores and result as they are given by the oracle.
+    """
+    initial_board = record.initial_board()
+    game_state = GameState(initial_board, load_sudoku_from_text(record.board), [], [], [0, 0])
+    result = GameRecord(initial_board, record.first, record.second, record.calculation_time, record.seed)
+    for i, j, value, _, _, think_time in record.moves:
+        player_number = len(game_state.moves) % 2 + 1
+        if game_state.board.empty_count == 0:
+            result.result = f'Player {player_number} made a move after the end of the game'
+            return result
+        if (i, j, value) == (0, 0, 0):
+            result.add_move(i, j, value, False, 0, think_time)
+            result.result = f'Player {player_number} was too slow'
+            return result
+        mistake, score, taboo = judge_move(game_state, Move(i, j, value), solve_sudoku_path)
+        result.add_move(i, j, value, taboo, score, think_time)
+        if mistake:
+            result.result = f'Player {player_number} made {mistake} move'
+            return result
+    # an incomplete record has no result
+    result.result = list(game_state.scores) if game_state.board.empty_count == 0 else None
+    return result
@@ -0,0 +1,403 @@
+"""
+An in-process sudoku oracle with the same semantics as the solve_sudoku program. It uses a bitmask backtracking
+solver that fills in the naked and hidden singles at every node, and then branches on the square with the fewest
+candidates.
+"""
+
+import functools
+import random
+import re
+import shlex
+from typing import List, Optional, Tuple
+from competitive_sudoku.sudoku import GameState, Move, SudokuBoard, TabooMove, load_sudoku_from_text, popcount
+
+VALID = 'valid'              # The move is played and the sudoku still has a solution
+INVALID = 'invalid'          # The move is outside of the board, has a value out of range, or fills a non-empty square
+ILLEGAL = 'illegal'          # The move puts a duplicate value in a row, column or block
+NO_SOLUTION = 'no solution'  # The move is legal, but the sudoku has no solution after playing it
+
+# The last solutions found by solve. The boards of a game change one square at a time, so a board often agrees with a
+# recent solution, and otherwise a recent solution is a good guide for the search.
+_known_solutions = []
+_max_known_solutions = 4
+
+
+@functools.lru_cache(maxsize=None)
+def square_regions(m: int, n: int) -> Tuple[List[int], List[int], List[int]]:
+    """
+    Gets the row, column and block of every square of a board with blocks of size m x n.
+    @param m: The number of rows in a block.
+    @param n: The number of columns in a block.
+    @return: Three lists that map the index k of a square in the board array to its row, column and block.
+    """
+    board = SudokuBoard(m, n)
+    N = board.N
+    rows = [k // N for k in range(N * N)]
+    columns = [k % N for k in range(N * N)]
+    blocks = [board.block_index(k // N, k % N) for k in range(N * N)]
+    return rows, columns, blocks
+
+
+@functools.lru_cache(maxsize=None)
+def square_units(m: int, n: int) -> List[List[int]]:
+    """
+    Gets the units of a board with blocks of size m x n, i.e. its rows, columns and blocks.
+    @param m: The number of rows in a block.
+    @param n: The number of columns in a block.
+    @return: A list of 3 * N lists with the indices of the squares of every unit in the board array.
+    """
+    N = m * n
+    rows, columns, blocks = square_regions(m, n)
+    units = [[] for _ in range(3 * N)]
+    for k in range(N * N):
+        units[rows[k]].append(k)
+        units[N + columns[k]].append(k)
+        units[2 * N + blocks[k]].append(k)
+    return units
+
+
+@functools.lru_cache(maxsize=None)
+def square_peers(m: int, n: int) -> List[List[int]]:
+    """
+    Gets the peers of every square of a board with blocks of size m x n, i.e. the other squares in its row, column and
+    block.
+    @param m: The number of rows in a block.
+    @param n: The number of columns in a block.
+    @return: A list that maps the index k of a square in the board array to the sorted indices of its peers.
+    """
+    N = m * n
+    peers = [set() for _ in range(N * N)]
+    for unit in square_units(m, n):
+        for k in unit:
+            peers[k].update(unit)
+    return [sorted(cells - {k}) for k, cells in enumerate(peers)]
+
+
+@functools.lru_cache(maxsize=None)
+def popcount_table(N: int) -> List[int]:
+    """
+    Gets a table with the number of values in every bitmask of values of a board with N values.
+    @param N: The number of values.
+    @return: A list that maps every mask in the range [0, ..., 2^N) to its number of set bits.
+    """
+    table = [0] * (1 << N)
+    for mask in range(1, 1 << N):
+        table[mask] = table[mask >> 1] + (mask & 1)
+    return table
+
+
+def is_consistent(board: SudokuBoard) -> bool:
+    """
+    Checks that no row, column or block of the board contains a duplicate value.
+    @param board: A sudoku board.
+    @return: True if the board does not contain duplicates.
+    """
+    filled = board.N * board.N - board.empty_count
+    for masks in (board.row_masks, board.column_masks, board.block_masks):
+        # A duplicate value sets the same bit twice, so the masks contain fewer values than there are filled squares
+        if sum(popcount(mask) for mask in masks) != filled:
+            return False
+    return True
+
+
+def solve(board: SudokuBoard) -> Optional[List[int]]:
+    """
+    Computes a solution of a sudoku.
+    @param board: A sudoku board. It is not modified.
+    @return: The squares of a solution, or None if the sudoku has no solution.
+    """
+    if not is_consistent(board):
+        return None
+    N = board.N
+    empty = SudokuBoard.empty
+    hint = None
+    for solution in _known_solutions:
+        if len(solution) == N * N:
+            if all(value == empty or value == solution[k] for k, value in enumerate(board.squares)):
+                return list(solution)
+            if hint is None:
+                hint = solution
+    units = square_units(board.m, board.n)
+    peers = square_peers(board.m, board.n)
+    counts = popcount_table(N)
+
+    def assign(squares, masks, k, value) -> bool:
+        # Fills in a square and removes the value from the candidates of its peers, and fills in every peer that is
+        # left with a single candidate. Returns False if a contradiction was found.
+        pending = [(k, value)]
+        while pending:
+            k, value = pending.pop()
+            if squares[k] != empty:
+                if squares[k] != value:
+                    return False
+                continue
+            bit = 1 << (value - 1)
+            if not masks[k] & bit:
+                return False
+            squares[k] = value
+            masks[k] = 0
+            for p in peers[k]:
+                mask = masks[p]
+                if mask & bit:
+                    mask ^= bit
+                    masks[p] = mask
+                    if not mask:
+                        return False
+                    if mask & (mask - 1) == 0:
+                        pending.append((p, mask.bit_length()))
+        return True
+
+    def propagate(squares, masks) -> bool:
+        # Fills in the hidden singles, i.e. the values that have one possible square in a unit, until there are none
+        # left. The naked singles are filled in by assign. Returns False if a contradiction was found.
+        full_mask = board.full_mask
+        changed = True
+        while changed:
+            changed = False
+            for unit in units:
+                once = 0
+                twice = 0
+                used = 0
+                for k in unit:
+                    mask = masks[k]
+                    if mask:
+                        twice |= once & mask
+                        once |= mask
+                    else:
+                        used |= 1 << (squares[k] - 1)
+                if once | used != full_mask:
+                    # A value that is missing in the unit cannot be placed anywhere
+                    return False
+                hidden = once & ~twice & ~used
+                while hidden:
+                    bit = hidden & -hidden
+                    hidden ^= bit
+                    for k in unit:
+                        if masks[k] & bit:
+                            if not assign(squares, masks, k, bit.bit_length()):
+                                return False
+                            changed = True
+                            break
+        return True
+
+    def search(squares, masks) -> Optional[List[int]]:
+        if not propagate(squares, masks):
+            return None
+
+        # Select the empty square with the fewest candidates
+        best_k = -1
+        best_count = N + 1
+        for k, mask in enumerate(masks):
+            if mask:
+                count = counts[mask]
+                if count < best_count:
+                    best_k, best_count = k, count
+                    if count == 2:
+                        break
+        if best_k < 0:
+            return squares
+        branches = [(best_k, value) for value in range(1, N + 1) if masks[best_k] & (1 << (value - 1))]
+
+        # A value with fewer possible squares in a unit than the candidates of the best square is a better choice
+        if best_count > 2:
+            for unit in units:
+                for bit in (1 << value for value in range(N)):
+                    places = [k for k in unit if masks[k] & bit]
+                    if 0 < len(places) < len(branches):
+                        branches = [(k, bit.bit_length()) for k in places]
+                        if len(branches) == 2:
+                            break
+                if len(branches) == 2:
+                    break
+        if hint is not None:
+            # Try the value of a recent solution first
+            branches.sort(key=lambda branch: branch[1] != hint[branch[0]])
+
+        for k, value in branches:
+            child_squares, child_masks = list(squares), list(masks)
+            if assign(child_squares, child_masks, k, value):
+                solution = search(child_squares, child_masks)
+                if solution is not None:
+                    return solution
+        return None
+
+    squares = list(board.squares)
+    masks = [board.candidates(k // N, k % N) for k in range(N * N)]
+    # A square without candidates cannot be filled in, and the squares with one candidate have to be
+    for k, mask in enumerate(masks):
+        if squares[k] == empty and not mask:
+            return None
+    for k, mask in enumerate(masks):
+        if mask and mask & (mask - 1) == 0 and not assign(squares, masks, k, mask.bit_length()):
+            return None
+    solution = search(squares, masks)
+    if solution is not None:
+        _known_solutions.insert(0, list(solution))
+        del _known_solutions[_max_known_solutions:]
+    return solution
+
+
+def has_solution(board: SudokuBoard) -> bool:
+    """
+    Checks if a sudoku has a solution.
+    @param board: A sudoku board. It is not modified.
+    @return: True if the sudoku has a solution.
+    """
+    return solve(board) is not None
+
+
+def check_move(board: SudokuBoard, move: Move) -> Tuple[str, int]:
+    """
+    Checks a move like solve_sudoku --move does. The board is not modified.
+    @param board: A sudoku board.
+    @param move: A move.
+    @return: A tuple (status, score), with status one of VALID, INVALID, ILLEGAL and NO_SOLUTION. The score is the
+    reward of the regions completed by the move, and 0 unless the status is VALID.
+    """
+    N = board.N
+    i, j, value = move.i, move.j, move.value
+    if not (0 <= i < N and 0 <= j < N and 1 <= value <= N) or board.get(i, j) != SudokuBoard.empty:
+        return INVALID, 0
+    if board.used_values(i, j) & (1 << (value - 1)):
+        return ILLEGAL, 0
+    board.put(i, j, value)
+    try:
+        if not has_solution(board):
+            return NO_SOLUTION, 0
+        return VALID, GameState.region_scores[board.completed_regions(i, j)]
+    finally:
+        board.put(i, j, SudokuBoard.empty)
+
+
+def legal_moves(board: SudokuBoard, taboo_moves: List[TabooMove]) -> List[Move]:
+    """
+    Generates the moves that do not violate the constraints of the sudoku and that are not taboo.
+    @param board: A sudoku board.
+    @param taboo_moves: A list of taboo moves.
+    @return: The legal moves.
+    """
+    N = board.N
+    taboo = set((move.i, move.j, move.value) for move in taboo_moves)
+    moves = []
+    for i in range(N):
+        for j in range(N):
+            candidates = board.candidates(i, j)
+            value = 1
+            while candidates:
+                if candidates & 1 and (i, j, value) not in taboo:
+                    moves.append(Move(i, j, value))
+                candidates >>= 1
+                value += 1
+    return moves
+
+
+def random_move(board: SudokuBoard, taboo_moves: List[TabooMove]) -> Optional[Move]:
+    """
+    Generates a random move like solve_sudoku --random does.
+    @param board: A sudoku board.
+    @param taboo_moves: A list of taboo moves.
+    @return: A random legal move, or None if there is no legal move.
+    """
+    moves = legal_moves(board, taboo_moves)
+    return random.choice(moves) if moves else None
+
+
+def greedy_move(board: SudokuBoard, taboo_moves: List[TabooMove]) -> Optional[Move]:
+    """
+    Generates a greedy move like solve_sudoku --greedy does, i.e. a random move among the legal moves with the highest
+    immediate reward.
+    @param board: A sudoku board.
+    @param taboo_moves: A list of taboo moves.
+    @return: A greedy legal move, or None if there is no legal move.
+    """
+    best_score = -1
+    best_moves = []
+    for move in legal_moves(board, taboo_moves):
+        board.put(move.i, move.j, move.value)
+        score = GameState.region_scores[board.completed_regions(move.i, move.j)]
+        board.put(move.i, move.j, SudokuBoard.empty)
+        if score > best_score:
+            best_score = score
+            best_moves = [move]
+        elif score == best_score:
+            best_moves.append(move)
+    return random.choice(best_moves) if best_moves else None
+
+
+def parse_options(options: str) -> dict:
+    """
+    Parses command line options of solve_sudoku.
+    @param options: The command line options, e.g. '--move "3 5"' or '--greedy --taboo="0 1 2"'.
+    @return: A dictionary that maps option names without dashes to their values, or to True for flags.
+    """
+    result = {}
+    words = shlex.split(options)
+    index = 0
+    while index < len(words):
+        word = words[index]
+        index += 1
+        if not word.startswith('--'):
+            continue
+        name, sep, value = word[2:].partition('=')
+        if not sep:
+            if name in ('move', 'taboo') and index < len(words):
+                value = words[index]
+                index += 1
+            else:
+                value = True
+        result[name] = value
+    return result
+
+
+def solve_sudoku(board_text: str, options: str = '') -> str:
+    """
+    Runs the oracle in-process, with the same options and output as the solve_sudoku program.
+    @param board_text: A string representation of a sudoku board.
+    @param options: Additional command line options, see parse_options.
+    @return: The output that solve_sudoku would give.
+    """
+    board = load_sudoku_from_text(board_text)
+    arguments = parse_options(options)
+
+    taboo_moves = []
+    if 'taboo' in arguments:
+        values = [int(word) for word in str(arguments['taboo']).split()]
+        taboo_moves = [TabooMove(*values[index:index + 3]) for index in range(0, len(values) - 2, 3)]
+
+    if 'greedy' in arguments or 'random' in arguments:
+        if 'greedy' in arguments:
+            move = greedy_move(board, taboo_moves)
+            if move is None:
+                return 'Error: could not find a greedy move.'
+        else:
+            move = random_move(board, taboo_moves)
+            if move is None:
+                return 'Error: could not find a legal move.'
+        return f'Generated move ({board.rc2f(move.i, move.j)},{move.value})'
+
+    if 'move' in arguments:
+        text = str(arguments['move'])
+        match = re.fullmatch(r'\s*(\d+)\s+(\d+)\s*', text)
+        if not match:
+            return f"Could not parse a move from '{text}'."
+        k, value = int(match.group(1)), int(match.group(2))
+        N = board.N
+        i, j = board.f2rc(k) if k < N * N else (N, 0)
+        status, score = check_move(board, Move(i, j, value))
+        if status == INVALID:
+            return f"Invalid move '{text}'."
+        if status == ILLEGAL:
+            return f"Illegal move '{text}'."
+        if status == NO_SOLUTION:
+            return f"The sudoku has no solution after move '{text}'."
+        return f"The sudoku has a solution (valid move '{text}').\nThe score is {score}"
+
+    solution = solve(board)
+    if solution is None:
+        return 'The sudoku has no solution.'
+    output = 'The sudoku has a solution.'
+    if 'print' in arguments:
+        for k, value in enumerate(solution):
+            board.put(*board.f2rc(k), value)
+        output += '\n' + str(board)
+    return output
@@ -0,0 +1,172 @@
+"""
+A long-lived oracle process. It is started once by the game simulator, and answers the requests of all processes that
+know its address: the simulator itself and every player process, also the ones that are started for a single move. The
+server hosts the in-process oracle of competitive_sudoku.oracle, so no process is started and no temporary file is
+written per request.
+
+The server listens on a multiprocessing.connection address (a unix socket or a named pipe), and every client keeps a
+connection open. A request is a tuple (board_text, options) with the arguments of solve_sudoku, and the response is
+the output that solve_sudoku would give. Where os.fork is available, every client is served by a forked copy of the
+server, such that the clients are answered in parallel; elsewhere every client is served by a thread.
+
+Run the server with 'python -m competitive_sudoku.oracle_server'. It prints its address on the first line of its output,
+and stops when its stdin is closed.
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from competitive_sudoku.execute import ORACLE_ADDRESS_PREFIX
+from competitive_sudoku.oracle import solve_sudoku
+
+
+def serve_client(connection) -> None:
+    """
+    Answers the requests of a client until it closes the connection.
+    @param connection: The connection with the client.
+    """
+    with connection:
+        while True:
+            try:
+                board_text, options = connection.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                output = solve_sudoku(board_text, options)
+            except Exception as err:
+                output = f'Error: {err}'
+            connection.send(output)
+
+
+def start_client(connection) -> None:
+    """
+    Serves a new client in a forked process, or else in a thread.
+    @param connection: The connection with the client.
+    """
+    if not hasattr(os, 'fork'):
+        threading.Thread(target=serve_client, args=(connection,), daemon=True).start()
+        return
+    if os.fork() == 0:
+        serve_client(connection)
+        os._exit(0)
+    connection.close()
+
+
+def serve(input_stream, output_stream) -> None:
+    """
+    Runs the server until the input stream is closed.
+    @param input_stream: A text stream that is closed to stop the server.
+    @param output_stream: A text stream to which the address of the server is written.
+    """
+    authkey = os.urandom(16)
+    listener = Listener(authkey=authkey)
+    stopped = threading.Event()
+    if hasattr(signal, 'SIGCHLD'):
+        # the forked processes are reaped automatically
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    def accept_clients():
+        while not stopped.is_set():
+            try:
+                connection = listener.accept()
+            except (EOFError, OSError, AuthenticationError):
+                # the listener was closed, or the client failed to authenticate
+                continue
+            start_client(connection)
+
+    threading.Thread(target=accept_clients, daemon=True).start()
+    output_stream.write(f'{ORACLE_ADDRESS_PREFIX}{authkey.hex()}@{listener.address}\n')
+    output_stream.flush()
+    input_stream.read()
+    stopped.set()
+    listener.close()
+
+
+class OracleServer(object):
+    """
+    The owner of an oracle server process. The process is started by start and stopped by close.
+    """
+
+    def __init__(self):
+        self.process = None
+        self.address = None
+
+    def start(self) -> str:
+        """
+        Starts the server process, if it is not running yet.
+        @return: The address of the server, which can be used as solve_sudoku_path in any process.
+        """
+        if self.process is not None and self.process.poll() is None:
+            return self.address
+        root = str(Path(__file__).resolve().parent.parent)
+        env = dict(os.environ)
+        env['PYTHONPATH'] = root + os.pathsep + env['PYTHONPATH'] if env.get('PYTHONPATH') else root
+        self.process = subprocess.Popen([sys.executable, '-m', 'competitive_sudoku.oracle_server'],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env,
+                                        universal_newlines=True, bufsize=1)
+        address = self.process.stdout.readline().strip()
+        if not address.startswith(ORACLE_ADDRESS_PREFIX):
+            self.close()
+            raise RuntimeError('The oracle server could not be started')
+        self.address = address
+        return address
+
+    def close(self) -> None:
+        """
+        Stops the server process.
+        """
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+            self.process.stdout.close()
+            self.process = None
+            self.address = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class OracleClient(object):
+    """
+    A connection to an oracle server. A connection must not be used by two threads at the same time.
+    """
+
+    def __init__(self, address: str):
+        """
+        Connects to a server.
+        @param address: The address of the server, see OracleServer.start.
+        """
+        authkey, _, location = address[len(ORACLE_ADDRESS_PREFIX):].partition('@')
+        self.connection = Client(location, authkey=bytes.fromhex(authkey))
+
+    def solve_sudoku(self, board_text: str, options: str = '') -> str:
+        """
+        Sends a request to the server. This is a drop-in replacement of execute.solve_sudoku.
+        @param board_text: A string representation of a sudoku board.
+        @param options: Additional command line options of solve_sudoku.
+        @return: The output that solve_sudoku would give.
+        """
+        try:
+            self.connection.send((board_text, options))
+            return self.connection.recv()
+        except (EOFError, OSError):
+            raise RuntimeError('The oracle server stopped unexpectedly')
+
+    def close(self) -> None:
+        """
+        Closes the connection.
+        """
+        self.connection.close()
+
+
+if __name__ == '__main__':
+    serve(sys.stdin, sys.stdout)
@@ -0,0 +1,156 @@
+"""
+A low-overhead sampling profiler for player processes. A profiling timer (SIGPROF) interrupts the process at a fixed
+interval of CPU time, and the stack of the interrupted frame is counted. The stacks are written in the collapsed
+format of flamegraph.pl and speedscope, one 'frame;frame;frame count' line per stack.
+
+Player processes are terminated at the deadline, so the samples are written when the process receives SIGTERM, or
+when the profiler is stopped cooperatively. Every process writes its own file '<engine>.<pid>.folded', and
+merge_profiles combines the files of an engine into '<engine>.folded'.
+"""
+
+import os
+import signal
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+DEFAULT_INTERVAL = 0.002  # The sampling interval in seconds of CPU time
+
+
+def is_supported() -> bool:
+    """
+    Checks whether the sampling profiler can be used on this platform, i.e. whether SIGPROF and setitimer are available.
+    @return: True if SamplingProfiler can be used.
+    """
+    return hasattr(signal, 'SIGPROF') and hasattr(signal, 'setitimer')
+
+
+def engine_name(player) -> str:
+    """
+    @param player: The AI of a player.
+    @return: The name of the module of the player, e.g. 'team37_A2'.
+    """
+    return type(player).__module__.split('.')[0]
+
+
+def frame_name(code) -> str:
+    """
+    @param code: The code object of a frame.
+    @return: The name of the frame in a profile.
+    """
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class SamplingProfiler(object):
+    """
+    Samples the stack of the main thread of the current process.
+    """
+
+    def __init__(self, filename: str, interval: float = DEFAULT_INTERVAL):
+        """
+        @param filename: The file to which the collapsed stacks are written.
+        @param interval: The sampling interval in seconds of CPU time.
+        """
+        self.filename = filename
+        self.interval = interval
+        self.samples = Counter()
+        self.names: Dict[object, str] = {}  # Caches the names of code objects
+        self.running = False
+        self.root = None  # The outermost frame that is sampled
+
+    def sample(self, signum, frame) -> None:
+        names = self.names
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            name = names.get(code)
+            if name is None:
+                name = names[code] = frame_name(code)
+            stack.append(name)
+            if frame is self.root:
+                break
+            frame = frame.f_back
+        stack.reverse()
+        self.samples[';'.join(stack)] += 1
+
+    def terminate(self, signum, frame) -> None:
+        self.stop()
+        os._exit(0)
+
+    def start(self, root=None) -> None:
+        """
+        Starts sampling, and makes sure the samples are written when the process is terminated with SIGTERM.
+        @param root: The outermost frame that is sampled, or None to sample the whole stack. The frames outside the
+        root, e.g. those that a forked process inherits from its parent, are left out of the profile.
+        """
+        self.running = True
+        self.root = root
+        signal.signal(signal.SIGPROF, self.sample)
+        signal.signal(signal.SIGTERM, self.terminate)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self) -> None:
+        """
+        Stops sampling, and writes the samples. Stopping a profiler that is not running does nothing.
+        """
+        if not self.running:
+            return
+        self.running = False
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        self.write()
+
+    def write(self) -> None:
+        """
+        Appends the samples to the output file.
+        """
+        if not self.samples:
+            return
+        with open(self.filename, 'a') as f:
+            for stack, count in self.samples.items():
+                f.write(f'{stack} {count}\n')
+        self.samples.clear()
+
+
+def start_profiler(player, directory: Optional[str]) -> Optional[SamplingProfiler]:
+    """
+    Starts profiling a player process. The stacks start at the frame of the caller.
+    @param player: The AI of the player.
+    @param directory: The directory to which the profile is written, or None to disable profiling.
+    @return: The profiler, or None if profiling is disabled.
+    """
+    if directory is None:
+        return None
+    profiler = SamplingProfiler(os.path.join(directory, f'{engine_name(player)}.{os.getpid()}.folded'))
+    profiler.start(sys._getframe(1))
+    return profiler
+
+
+def merge_profiles(directory: str) -> Dict[str, int]:
+    """
+    Combines the profiles of all player processes in a directory into one profile per engine, and removes the
+    profiles of the processes. Existing profiles of an engine are added to.
+    @param directory: A directory with profiles.
+    @return: The total number of samples of every engine.
+    """
+    parts: Dict[str, list] = {}
+    for path in Path(directory).glob('*.*.folded'):
+        engine, pid, _ = path.name.rsplit('.', 2)
+        if pid.isdigit():
+            parts.setdefault(engine, []).append(path)
+    totals = {}
+    for engine, paths in parts.items():
+        target = Path(directory) / f'{engine}.folded'
+        samples = Counter()
+        for path in ([target] if target.exists() else []) + paths:
+            for line in path.read_text().splitlines():
+                stack, _, count = line.rpartition(' ')
+                if stack:
+                    samples[stack] += int(count)
+        target.write_text(''.join(f'{stack} {count}\n' for stack, count in sorted(samples.items())))
+        for path in paths:
+            path.unlink()
+        totals[engine] = sum(samples.values())
+    return totals
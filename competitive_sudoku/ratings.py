@@ -0,0 +1,119 @@
+"""
+Elo ratings of players from the results of a set of games. The ratings are a maximum likelihood fit of the
+Bradley-Terry model, with a BayesElo style prior of virtual draws between every pair of players that played each
+other, such that a player that lost (or won) all its games still gets a finite rating.
+"""
+
+import math
+from typing import Dict, List, Tuple
+
+ELO_SCALE = 400 / math.log(10)  # Converts a natural logarithm of a strength ratio into Elo points
+
+
+def expected_score(elo_difference: float) -> float:
+    """
+    Computes the expected score of a player against an opponent.
+    @param elo_difference: The rating of the player minus the rating of the opponent.
+    @return: The expected score, between 0 and 1.
+    """
+    return 1 / (1 + 10 ** (-elo_difference / 400))
+
+
+def elo_difference(score: float) -> float:
+    """
+    Computes the rating difference that corresponds to an expected score. This is the inverse of expected_score.
+    @param score: An expected score, strictly between 0 and 1.
+    @return: The rating difference in Elo points.
+    """
+    return -400 * math.log10(1 / score - 1)
+
+
+def fit_ratings(results: List[Tuple[str, str, float]], prior: float = 2.0, iterations: int = 1000, z: float = 1.96) -> Dict[str, Tuple[float, float]]:
+    """
+    Fits Elo ratings to the results of games. The ratings have an average of 0.
+    @param results: A list of games (player, opponent, score), with score 1 for a win of player, 0.5 for a draw and
+    0 for a loss.
+    @param prior: The number of virtual draws that is added between every pair of players that played each other.
+    @param iterations: The maximum number of iterations of the fit.
+    @param z: The quantile of the normal distribution of the confidence interval, 1.96 gives a 95% interval.
+    @return: A mapping of every player to its rating and the half width of its confidence interval. The confidence
+    interval is based on the observed information of the player, treating the ratings of its opponents as exact.
+    """
+    players = sorted({name for a, b, _ in results for name in (a, b)})
+    index = {name: k for k, name in enumerate(players)}
+    n = len(players)
+    if n == 0:
+        return {}
+
+    # games[a][b] is the number of games between a and b, wins[a] the total score of a
+    games = [[0.0] * n for _ in range(n)]
+    wins = [0.0] * n
+    for a, b, score in results:
+        a, b = index[a], index[b]
+        games[a][b] += 1
+        games[b][a] += 1
+        wins[a] += score
+        wins[b] += 1 - score
+    for a in range(n):
+        for b in range(n):
+            if a != b and games[a][b] > 0:
+                games[a][b] += prior
+                wins[a] += prior / 2
+
+    # the minorization-maximization algorithm of Hunter (2004) for the Bradley-Terry model
+    gamma = [1.0] * n
+    for _ in range(iterations):
+        updated = []
+        for a in range(n):
+            denominator = sum(games[a][b] / (gamma[a] + gamma[b]) for b in range(n) if b != a and games[a][b] > 0)
+            updated.append(wins[a] / denominator if denominator > 0 else gamma[a])
+        mean = sum(math.log(g) for g in updated) / n
+        updated = [g / math.exp(mean) for g in updated]
+        converged = max(abs(math.log(g) - math.log(h)) for g, h in zip(gamma, updated)) < 1e-9
+        gamma = updated
+        if converged:
+            break
+
+    ratings = {}
+    for a in range(n):
+        information = sum(games[a][b] * gamma[a] * gamma[b] / (gamma[a] + gamma[b]) ** 2 for b in range(n) if b != a)
+        interval = z * ELO_SCALE / math.sqrt(information) if information > 0 else math.inf
+        ratings[players[a]] = (ELO_SCALE * math.log(gamma[a]), interval)
+    return ratings
+
+
+def sprt_bounds(alpha: float, beta: float) -> Tuple[float, float]:
+    """
+    Computes the bounds of the log-likelihood ratio of a sequential probability ratio test.
+    @param alpha: The probability of accepting H1 if H0 is true (false positive).
+    @param beta: The probability of accepting H0 if H1 is true (false negative).
+    @return: The lower bound, below which H0 is accepted, and the upper bound, above which H1 is accepted.
+    """
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def sprt_llr(wins: float, draws: float, losses: float, elo0: float, elo1: float) -> float:
+    """
+    Computes the log-likelihood ratio of the hypotheses H1: the rating difference is elo1, and H0: the rating
+    difference is elo0, given the results of a player against an opponent. It uses the normal approximation of the
+    score distribution of cutechess and fishtest.
+    @param wins: The number of wins of the player.
+    @param draws: The number of draws.
+    @param losses: The number of losses of the player.
+    @param elo0: The rating difference of H0.
+    @param elo1: The rating difference of H1.
+    @return: The log-likelihood ratio, or 0 if there are no results.
+    """
+    if wins + draws + losses == 0:
+        return 0.0
+    if wins == 0 or losses == 0:
+        # half a win and half a loss are added to avoid a zero variance after a series of only wins or losses
+        wins, losses = wins + 0.5, losses + 0.5
+    n = wins + draws + losses
+    w, d = wins / n, draws / n
+    score = w + d / 2
+    variance = w + d / 4 - score ** 2
+    if variance <= 0:
+        return 0.0
+    s0, s1 = expected_score(elo0), expected_score(elo1)
+    return (s1 - s0) * (2 * score - s0 - s1) / (2 * variance / n)
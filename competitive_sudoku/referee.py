@@ -0,0 +1,46 @@
+"""
+The rules of the game as they are enforced by the simulators: a proposed move is checked and scored by the oracle.
+"""
+
+import re
+from typing import Optional, Tuple
+from competitive_sudoku.execute import solve_sudoku
+from competitive_sudoku.sudoku import GameState, Move, TabooMove
+
+TABOO = 'TABOO'  # The move was declared taboo earlier in the game
+INVALID = 'INVALID'  # The move is outside the board, or its value is out of range
+ILLEGAL = 'ILLEGAL'  # The square is not empty, or the value already occurs in one of its regions
+
+
+def judge_move(game_state: GameState, move: Move, solve_sudoku_path: str) -> Tuple[Optional[str], int, bool]:
+    """
+    Checks a move of the player to move with the oracle, and plays it in game_state. A move after which the sudoku
+    has no solution is recorded as a taboo move, and the turn passes to the other player without a reward.
+    @param game_state: The current game state. It is not modified if the move is a mistake.
+    @param move: The proposed move.
+    @param solve_sudoku_path: The location of the oracle.
+    @return: A tuple (mistake, score, taboo), with mistake one of TABOO, INVALID and ILLEGAL, or None if the move was
+    played; score the reward of the move; and taboo True if the move turned out to be a taboo move.
+    """
+    i, j, value = move.i, move.j, move.value
+    if game_state.is_taboo(i, j, value):
+        return TABOO, 0, False
+    board_text = str(game_state.board)
+    options = f'--move "{game_state.board.rc2f(i, j)} {value}"'
+    output = solve_sudoku(solve_sudoku_path, board_text, options)
+    if 'Invalid move' in output:
+        return INVALID, 0, False
+    if 'Illegal move' in output:
+        return ILLEGAL, 0, False
+    if 'has no solution' in output:
+        game_state.apply(TabooMove(i, j, value))
+        return None, 0, True
+    match = re.search(r'The score is ([-\d]+)', output)
+    if not match:
+        raise RuntimeError(f'Unexpected output of sudoku solver: "{output}".')
+    score = int(match.group(1))
+    player = len(game_state.moves) % 2
+    game_state.board.put(i, j, value)
+    game_state.moves.append(Move(i, j, value))
+    game_state.scores[player] += score
+    return None, score, False
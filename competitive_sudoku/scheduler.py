@@ -0,0 +1,74 @@
+"""
+Core-aware scheduling of concurrent games. Every running game gets a dedicated CPU core, to which its player
+processes are pinned, such that each engine gets the full CPU time of its time budget.
+"""
+
+import os
+import threading
+from typing import List, Optional
+
+
+def available_cores() -> List[int]:
+    """
+    Gets the CPU cores this process may run on, taking its CPU affinity into account where the platform supports it.
+    @return: The ids of the available cores.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def pin_to_core(core: Optional[int]) -> None:
+    """
+    Restricts the calling process to a single CPU core. This does nothing if core is None, or if the platform does not
+    support CPU affinity.
+    @param core: The id of a core, or None.
+    """
+    if core is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {core})
+
+
+def oversubscription_warning(workers: int, cores: List[int]) -> Optional[str]:
+    """
+    Checks whether running the given number of games concurrently oversubscribes the machine. Each game needs one core
+    for its thinking player.
+    @param workers: The number of concurrent games.
+    @param cores: The available cores.
+    @return: A warning message, or None if every game can get a dedicated core.
+    """
+    if workers > len(cores):
+        return (f'{workers} concurrent games need {workers} cores, but only {len(cores)} are available; '
+                'engines will get less CPU time than their time budget')
+    return None
+
+
+class CorePool(object):
+    """
+    A thread-safe pool of CPU cores. A game reserves a core for its whole duration.
+    """
+
+    def __init__(self, cores: List[int]):
+        """
+        @param cores: The ids of the cores in the pool.
+        """
+        self.free = list(cores)
+        self.condition = threading.Condition()
+
+    def acquire(self) -> int:
+        """
+        Takes a core from the pool, and waits until one is released if the pool is empty.
+        @return: The id of a core.
+        """
+        with self.condition:
+            while not self.free:
+                self.condition.wait()
+            return self.free.pop(0)
+
+    def release(self, core: int) -> None:
+        """
+        Puts a core back into the pool.
+        @param core: The id of a core that was taken with acquire.
+        """
+        with self.condition:
+            self.free.append(core)
+            self.condition.notify()
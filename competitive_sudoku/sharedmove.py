@@ -0,0 +1,87 @@
+"""
+A best move slot in shared memory, that a player process can update without locks or inter-process calls.
+"""
+
+import multiprocessing
+from typing import Tuple
+
+
+class SharedMove(object):
+    """
+    A triple (i, j, value) in shared memory with a single writer. It holds two slots and a version counter. A write
+    fills the slot that is not in use, and then increments the version, which selects the slot that was just written.
+    A write never touches the slot that the version selects, so the writer can be terminated in the middle of a write.
+    The slot of a reader can be overwritten by the second write after the one it reads, which increments the version,
+    so a reader checks the version again after reading a slot and retries if it changed (a seqlock). The version also
+    counts the number of writes. Every slot also has a flag that marks the triple as final, i.e. the
+    writer will not improve it anymore.
+    """
+
+    def __init__(self):
+        # The layout is [version, i0, j0, value0, final0, i1, j1, value1, final1], the slot in use is version % 2
+        self.slots = multiprocessing.RawArray('q', 9)
+
+    def store(self, i: int, j: int, value: int, final: bool = False) -> None:
+        """
+        Writes a new triple.
+        @param i: A row value.
+        @param j: A column value.
+        @param value: A value.
+        @param final: Whether the triple is final.
+        """
+        slots = self.slots
+        version = slots[0] + 1
+        offset = 1 + 4 * (version & 1)
+        slots[offset] = i
+        slots[offset + 1] = j
+        slots[offset + 2] = value
+        slots[offset + 3] = final
+        slots[0] = version
+
+    def read_slot(self) -> Tuple[int, int, int, int]:
+        """
+        Reads the slot of the last complete write, and retries until no write landed in the slot during the read.
+        @return: The tuple (i, j, value, final).
+        """
+        slots = self.slots
+        while True:
+            version = slots[0]
+            offset = 1 + 4 * (version & 1)
+            slot = slots[offset], slots[offset + 1], slots[offset + 2], slots[offset + 3]
+            if slots[0] == version:
+                return slot
+
+    def load(self) -> Tuple[int, int, int]:
+        """
+        Reads the last complete triple.
+        @return: The triple (i, j, value).
+        """
+        return self.read_slot()[:3]
+
+    def is_final(self) -> bool:
+        """
+        Checks whether the last complete triple was marked as final.
+        @return: The final flag of the triple.
+        """
+        return self.read_slot()[3] != 0
+
+    def version(self) -> int:
+        """
+        Gets the number of writes so far.
+        @return: The version counter.
+        """
+        return self.slots[0]
+
+    def __getitem__(self, index: int) -> int:
+        return self.load()[index]
+
+    def __setitem__(self, index: int, value: int) -> None:
+        triple = list(self.load())
+        triple[index] = value
+        self.store(*triple)
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self) -> int:
+        return 3
@@ -2,6 +2,8 @@
 #  Software License, (See accompanying file LICENSE or copy at
 #  https://www.gnu.org/licenses/gpl-3.0.txt)
 
+import functools
+import random
 from typing import List, Tuple, Union
 
 
@@ -42,6 +44,24 @@ class TabooMove(Move):
         super().__init__(i, j, value)
 
 
+ZOBRIST_SEED = 20211  # A fixed seed, such that position hashes are the same in every process and run
+ZOBRIST_SIDE_KEY = random.Random(ZOBRIST_SEED).getrandbits(64)  # Hashes the second player being to move
+
+
+@functools.lru_cache(maxsize=None)
+def zobrist_keys(N: int) -> Tuple[List[int], List[int]]:
+    """
+    Gets the random 64-bit keys that are used for the Zobrist hashes of positions on boards with N * N squares.
+    @param N: The number of values of the board.
+    @return: The keys for the squares and the keys for the taboo moves. Both are indexed by N * k + value - 1, with k
+    the index of a square in the board array.
+    """
+    generator = random.Random(ZOBRIST_SEED * 100 + N)
+    square_keys = [generator.getrandbits(64) for _ in range(N * N * N)]
+    taboo_keys = [generator.getrandbits(64) for _ in range(N * N * N)]
+    return square_keys, taboo_keys
+
+
 class SudokuBoard(object):
     """
     A simple board class for Sudoku. It supports arbitrary rectangular blocks.
@@ -61,6 +81,21 @@ class SudokuBoard(object):
         self.N = N     # N = m * n, numbers are in the range [1, ..., N]
         self.squares = [SudokuBoard.empty] * (N * N)  # The N*N squares of the board
 
+        # Bitmasks of the values used in every row, column and block. The value v corresponds to bit v - 1.
+        self.row_masks = [0] * N
+        self.column_masks = [0] * N
+        self.block_masks = [0] * N
+        self.full_mask = (1 << N) - 1
+
+        # The number of empty squares in every row, column and block, and on the whole board.
+        self.row_empty = [N] * N
+        self.column_empty = [N] * N
+        self.block_empty = [N] * N
+        self.empty_count = N * N
+
+        # The Zobrist hash of the values on the board, see zobrist_keys.
+        self.zobrist = 0
+
     def rc2f(self, i: int, j: int):
         """
         Converts row/column coordinates to the corresponding index in the board array.
@@ -82,14 +117,49 @@ class SudokuBoard(object):
         j = k % N
         return i, j
 
+    def block_index(self, i: int, j: int) -> int:
+        """
+        Computes the index of the block that contains the square with coordinates (i, j).
+        @param i: A row value in the range [0, ..., N)
+        @param j: A column value in the range [0, ..., N)
+        @return: A block index in the range [0, ..., N)
+        """
+        return (i // self.m) * self.m + j // self.n
+
     def put(self, i: int, j: int, value: int) -> None:
         """
-        Puts the given value on the square with coordinates (i, j).
+        Puts the given value on the square with coordinates (i, j). The used values of the row, column and block of
+        the square are updated accordingly. Putting SudokuBoard.empty clears the square.
         @param i: A row value in the range [0, ..., N)
         @param j: A column value in the range [0, ..., N)
-        @param value: A value in the range [1, ..., N]
+        @param value: A value in the range [1, ..., N], or SudokuBoard.empty
         """
         k = self.rc2f(i, j)
+        b = self.block_index(i, j)
+        old_value = self.squares[k]
+        if old_value == value:
+            return
+        square_keys = zobrist_keys(self.N)[0]
+        if old_value != SudokuBoard.empty:
+            self.zobrist ^= square_keys[self.N * k + old_value - 1]
+            bit = ~(1 << (old_value - 1))
+            self.row_masks[i] &= bit
+            self.column_masks[j] &= bit
+            self.block_masks[b] &= bit
+            self.row_empty[i] += 1
+            self.column_empty[j] += 1
+            self.block_empty[b] += 1
+            self.empty_count += 1
+        if value != SudokuBoard.empty:
+            self.zobrist ^= square_keys[self.N * k + value - 1]
+            bit = 1 << (value - 1)
+            self.row_masks[i] |= bit
+            self.column_masks[j] |= bit
+            self.block_masks[b] |= bit
+            self.row_empty[i] -= 1
+            self.column_empty[j] -= 1
+            self.block_empty[b] -= 1
+            self.empty_count -= 1
         self.squares[k] = value
 
     def get(self, i: int, j: int):
@@ -102,6 +172,37 @@ class SudokuBoard(object):
         k = self.rc2f(i, j)
         return self.squares[k]
 
+    def used_values(self, i: int, j: int) -> int:
+        """
+        Gets the values that are used in the row, column or block of the square with coordinates (i, j).
+        @param i: A row value in the range [0, ..., N)
+        @param j: A column value in the range [0, ..., N)
+        @return: A bitmask in which bit v - 1 is set if the value v is used.
+        """
+        return self.row_masks[i] | self.column_masks[j] | self.block_masks[self.block_index(i, j)]
+
+    def candidates(self, i: int, j: int) -> int:
+        """
+        Gets the values that can be put on the square with coordinates (i, j) without creating a duplicate entry in
+        its row, column or block. Taboo moves are not taken into account.
+        @param i: A row value in the range [0, ..., N)
+        @param j: A column value in the range [0, ..., N)
+        @return: A bitmask in which bit v - 1 is set if the value v is a candidate. It is 0 for non-empty squares.
+        """
+        if self.squares[self.N * i + j] != SudokuBoard.empty:
+            return 0
+        return self.full_mask & ~self.used_values(i, j)
+
+    def completed_regions(self, i: int, j: int) -> int:
+        """
+        Counts the regions (row, column and block) containing the square with coordinates (i, j) that have no empty
+        squares left.
+        @param i: A row value in the range [0, ..., N)
+        @param j: A column value in the range [0, ..., N)
+        @return: A value in the range [0, ..., 3]
+        """
+        return (self.row_empty[i] == 0) + (self.column_empty[j] == 0) + (self.block_empty[self.block_index(i, j)] == 0)
+
     def __str__(self) -> str:
         """
         Prints the board in a simple textual format. The first line contains the values m and n. Then the contents of
@@ -128,6 +229,31 @@ class SudokuBoard(object):
         return out.getvalue()
 
 
+def mask_values(mask: int) -> List[int]:
+    """
+    Converts a bitmask of values, as used by SudokuBoard, to the corresponding list of values.
+    @param mask: A bitmask in which bit v - 1 is set if the value v is present.
+    @return: The values in the mask, in increasing order.
+    """
+    values = []
+    value = 1
+    while mask:
+        if mask & 1:
+            values.append(value)
+        mask >>= 1
+        value += 1
+    return values
+
+
+def popcount(mask: int) -> int:
+    """
+    Counts the number of values in a bitmask of values.
+    @param mask: A bitmask in which bit v - 1 is set if the value v is present.
+    @return: The number of set bits.
+    """
+    return bin(mask).count('1')
+
+
 # written by Gennaro Gala
 def print_board(board: SudokuBoard) -> str:
     import io
@@ -216,7 +342,8 @@ def load_sudoku_from_text(text: str) -> SudokuBoard:
         s = words[k + 2]
         if s != '.':
             value = int(s)
-            result.squares[k] = value
+            i, j = result.f2rc(k)
+            result.put(i, j, value)
     return result
 
 
@@ -243,6 +370,8 @@ def save_sudoku(filename, board: SudokuBoard) -> None:
 
 
 class GameState(object):
+    region_scores = [0, 1, 3, 7]  # The reward of a move that completes 0, 1, 2 or 3 regions
+
     def __init__(self,
                  initial_board: SudokuBoard,
                  board: SudokuBoard,
@@ -261,6 +390,130 @@ class GameState(object):
         self.taboo_moves = taboo_moves
         self.moves = moves
         self.scores = scores
+        self.undo_stack = []  # The information needed to undo the moves played with apply
+
+    @property
+    def taboo_moves(self) -> List[TabooMove]:
+        """
+        The list of taboo moves. Use add_taboo_move and remove_taboo_move to modify it, such that the taboo masks and
+        the Zobrist hash of the taboo moves stay up to date. Assigning a new list rebuilds them, a move that occurs in
+        the list more than once is taboo once.
+        """
+        return self._taboo_moves
+
+    @taboo_moves.setter
+    def taboo_moves(self, taboo_moves: List[TabooMove]) -> None:
+        N = self.board.N
+        self._taboo_moves = taboo_moves
+        self.taboo_masks = [0] * (N * N)  # For every square a bitmask of the values that are taboo, see SudokuBoard
+        self.taboo_zobrist = 0  # The Zobrist hash of the taboo moves, see zobrist_keys
+        for move in taboo_moves:
+            if not self.is_taboo(move.i, move.j, move.value):
+                self.toggle_taboo(move)
+
+    def toggle_taboo(self, move: Move) -> None:
+        """
+        Flips the taboo status of a move in the taboo masks and the Zobrist hash, without changing the list of taboo
+        moves.
+        @param move: A move.
+        """
+        N = self.board.N
+        k = N * move.i + move.j
+        self.taboo_masks[k] ^= 1 << (move.value - 1)
+        self.taboo_zobrist ^= zobrist_keys(N)[1][N * k + move.value - 1]
+
+    def add_taboo_move(self, move: TabooMove) -> None:
+        """
+        Adds a move to the taboo moves. The move must not be taboo already.
+        @param move: A taboo move.
+        """
+        assert not self.is_taboo(move.i, move.j, move.value), f'{move} is taboo already'
+        self._taboo_moves.append(move)
+        self.toggle_taboo(move)
+
+    def remove_taboo_move(self, move: TabooMove) -> None:
+        """
+        Removes a move from the taboo moves. If the move occurs more than once in the list, it stays taboo.
+        @param move: A taboo move.
+        """
+        self._taboo_moves.remove(move)
+        if move not in self._taboo_moves:
+            self.toggle_taboo(move)
+
+    def is_taboo(self, i: int, j: int, value: int) -> bool:
+        """
+        Checks in constant time whether the move (i, j) -> value is a taboo move.
+        @param i: A row value in the range [0, ..., N)
+        @param j: A column value in the range [0, ..., N)
+        @param value: A value in the range [1, ..., N]
+        @return: True if the move is in the taboo moves.
+        """
+        return (self.taboo_masks[self.board.N * i + j] >> (value - 1)) & 1 == 1
+
+    def candidates(self, i: int, j: int) -> int:
+        """
+        Gets the values that can be put on the square with coordinates (i, j) without creating a duplicate entry in
+        its row, column or block, and without playing a taboo move.
+        @param i: A row value in the range [0, ..., N)
+        @param j: A column value in the range [0, ..., N)
+        @return: A bitmask in which bit v - 1 is set if the value v is a candidate, see SudokuBoard.candidates.
+        """
+        return self.board.candidates(i, j) & ~self.taboo_masks[self.board.N * i + j]
+
+    def position_hash(self) -> int:
+        """
+        Computes a 64-bit Zobrist hash of the position, i.e. the values on the board, the player to move and the taboo
+        moves. It is maintained incrementally by SudokuBoard.put, apply and undo, so this takes constant time.
+        @return: The hash of the position.
+        """
+        side = ZOBRIST_SIDE_KEY if len(self.moves) % 2 else 0
+        return self.board.zobrist ^ self.taboo_zobrist ^ side
+
+    def current_player(self) -> int:
+        """
+        Gets the player that has to play the next move.
+        @return: 1 for the first player, 2 for the second player.
+        """
+        return 1 if len(self.moves) % 2 == 0 else 2
+
+    def apply(self, move: Union[Move, TabooMove]) -> int:
+        """
+        Plays a move in place for the player to move. A regular move is put on the board and rewarded with the score of
+        the regions it completes. A taboo move is added to the taboo moves and does not change the board or the scores.
+        In both cases the move is appended to the history, such that the turn passes to the other player.
+        @param move: A move of the current player.
+        @return: The reward of the move.
+        """
+        player = len(self.moves) % 2
+        if isinstance(move, TabooMove):
+            reward = 0
+            old_value = SudokuBoard.empty
+            self.add_taboo_move(move)
+        else:
+            board = self.board
+            i, j = move.i, move.j
+            old_value = board.get(i, j)
+            board.put(i, j, move.value)
+            reward = GameState.region_scores[board.completed_regions(i, j)]
+            self.scores[player] += reward
+        self.moves.append(move)
+        self.undo_stack.append((old_value, reward))
+        return reward
+
+    def undo(self) -> Union[Move, TabooMove]:
+        """
+        Takes back the last move that was played with apply, and restores the board, the history, the scores and the
+        taboo moves exactly.
+        @return: The move that was taken back.
+        """
+        old_value, reward = self.undo_stack.pop()
+        move = self.moves.pop()
+        if isinstance(move, TabooMove):
+            self.toggle_taboo(self._taboo_moves.pop())
+        else:
+            self.board.put(move.i, move.j, old_value)
+            self.scores[len(self.moves) % 2] -= reward
+        return move
 
     def __str__(self):
         import io
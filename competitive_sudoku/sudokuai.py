@@ -2,8 +2,11 @@
 #  Software License, (See accompanying file LICENSE or copy at
 #  https://www.gnu.org/licenses/gpl-3.0.txt)
 
+import math
+import time
 from typing import List
 from competitive_sudoku.sudoku import GameState, Move
+from competitive_sudoku.sharedmove import SharedMove
 
 
 class SudokuAI(object):
@@ -14,16 +17,29 @@ class SudokuAI(object):
     def __init__(self):
         self.best_move: List[int] = [0, 0, 0]
         self.lock = None
+        self.telemetry = None  # N.B. this is set by the game playing framework, see competitive_sudoku.telemetry
+        self.deadline = None  # N.B. this is set by the game playing framework, see remaining_time
 
     def compute_best_move(self, game_state: GameState) -> None:
         """
         This function should compute the best move in game_state.board. It should report the best move by making one
         or more calls to propose_move. This function is run by a game playing framework in a separate thread, that will
-        be killed after a specific amount of time. The last reported move is the one that will be played.
+        be killed after a specific amount of time. The last reported move is the one that will be played. The time
+        that is left can be obtained with remaining_time.
         @param game_state: A Game state.
         """
         raise NotImplementedError
 
+    def remaining_time(self) -> float:
+        """
+        Gets the time that is left for computing the current move. The framework sets self.deadline to the value of
+        time.monotonic() at which the move must be known.
+        @return: The remaining time in seconds, or math.inf if the framework did not set a deadline.
+        """
+        if self.deadline is None:
+            return math.inf
+        return self.deadline - time.monotonic()
+
     def propose_move(self, move: Move) -> None:
         """
         Updates the best move that has been found so far.
@@ -31,6 +47,12 @@ class SudokuAI(object):
         @param move: A move.
         """
         i, j, value = move.i, move.j, move.value
+        if self.telemetry is not None:
+            self.telemetry.record_proposal()
+        if isinstance(self.best_move, SharedMove):
+            # A shared move is updated atomically, so no lock is needed
+            self.best_move.store(i, j, value)
+            return
         if self.lock:
             self.lock.acquire()
         self.best_move[0] = i
@@ -38,3 +60,29 @@ class SudokuAI(object):
         self.best_move[2] = value
         if self.lock:
             self.lock.release()
+
+    def propose_final_move(self, move: Move) -> None:
+        """
+        Updates the best move, and tells the game playing framework that it will not be improved anymore. The framework
+        may then end the turn before the time for computing the move is over.
+        @param move: A move.
+        """
+        if isinstance(self.best_move, SharedMove):
+            if self.telemetry is not None:
+                self.telemetry.record_proposal()
+            self.best_move.store(move.i, move.j, move.value, final=True)
+            return
+        self.propose_move(move)
+
+    def report_search(self, nodes: int = None, depth: int = None, tt_probes: int = None, tt_hits: int = None) -> None:
+        """
+        Reports statistics of the search for the current move to the game playing framework. It is cheap enough to be
+        called from inside a search, and does nothing if the framework does not collect telemetry. The arguments that
+        are None are left unchanged.
+        @param nodes: The number of nodes searched for the current move.
+        @param depth: The depth of the last completed iteration.
+        @param tt_probes: The number of transposition table lookups for the current move.
+        @param tt_hits: The number of successful transposition table lookups for the current move.
+        """
+        if self.telemetry is not None:
+            self.telemetry.update(nodes, depth, tt_probes, tt_hits)
@@ -0,0 +1,114 @@
+"""
+Search telemetry of a player. The player process writes a few counters into shared memory while it is thinking, and
+the simulator reads them after every move. This is cheap enough to update from inside a search.
+"""
+
+import multiprocessing
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# The layout of the shared array
+START, NODES, DEPTH, FIRST_PROPOSAL, PROPOSALS, TT_PROBES, TT_HITS = range(7)
+
+
+class Telemetry(object):
+    """
+    Counters of the current move of a player in shared memory, with a single writer.
+    """
+
+    def __init__(self):
+        self.values = multiprocessing.RawArray('d', 7)
+
+    def reset(self) -> None:
+        """
+        Clears the counters at the start of a move. This is done by the simulator.
+        """
+        values = self.values
+        for k in range(len(values)):
+            values[k] = 0
+        values[START] = time.monotonic()
+
+    def record_proposal(self) -> None:
+        """
+        Counts a proposed move, and records the time of the first proposal of the move.
+        """
+        values = self.values
+        if values[PROPOSALS] == 0:
+            values[FIRST_PROPOSAL] = time.monotonic() - values[START]
+        values[PROPOSALS] += 1
+
+    def update(self, nodes: Optional[int] = None, depth: Optional[int] = None, tt_probes: Optional[int] = None, tt_hits: Optional[int] = None) -> None:
+        """
+        Sets the counters of the search. The arguments that are None are left unchanged.
+        @param nodes: The number of nodes searched for the current move.
+        @param depth: The depth of the last completed iteration.
+        @param tt_probes: The number of transposition table lookups for the current move.
+        @param tt_hits: The number of successful transposition table lookups for the current move.
+        """
+        values = self.values
+        if nodes is not None:
+            values[NODES] = nodes
+        if depth is not None:
+            values[DEPTH] = depth
+        if tt_probes is not None:
+            values[TT_PROBES] = tt_probes
+        if tt_hits is not None:
+            values[TT_HITS] = tt_hits
+
+    def snapshot(self) -> Tuple[float, ...]:
+        """
+        @return: The counters (nodes, depth, first_proposal, proposals, tt_probes, tt_hits).
+        """
+        return tuple(self.values[NODES:])
+
+
+class TelemetrySummary(object):
+    """
+    Aggregates the telemetry of many moves, per player and board size. It can be shared by concurrent games.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # totals[key] = [moves, think_time, nodes, depth, max_depth, first_proposal, proposals, tt_probes, tt_hits, moves with a proposal]
+        self.totals: Dict[Tuple[int, str], List[float]] = defaultdict(lambda: [0.0] * 10)
+
+    def add(self, player_number: int, board_size: str, snapshot: Tuple[float, ...], think_time: float) -> None:
+        """
+        Adds the telemetry of a move.
+        @param player_number: The player that made the move.
+        @param board_size: The size of the board, e.g. '3x3'.
+        @param snapshot: The result of Telemetry.snapshot after the move.
+        @param think_time: The time in seconds that the player used for the move.
+        """
+        nodes, depth, first_proposal, proposals, tt_probes, tt_hits = snapshot
+        with self.lock:
+            totals = self.totals[(player_number, board_size)]
+            totals[0] += 1
+            totals[1] += think_time
+            totals[2] += nodes
+            totals[3] += depth
+            totals[4] = max(totals[4], depth)
+            totals[5] += first_proposal
+            totals[6] += proposals
+            totals[7] += tt_probes
+            totals[8] += tt_hits
+            totals[9] += proposals > 0
+
+    def report(self, names: Dict[int, str]) -> List[str]:
+        """
+        Formats the averages per player and board size.
+        @param names: The names of the players by player number.
+        @return: The lines of a table.
+        """
+        lines = [f"{'player':<20}{'board':>6}{'moves':>7}{'knps':>8}{'depth':>7}{'max':>5}{'first ms':>10}{'props':>7}{'tt hit':>8}"]
+        for (player_number, board_size), totals in sorted(self.totals.items()):
+            moves, think_time, nodes, depth, max_depth, first_proposal, proposals, tt_probes, tt_hits, proposed = totals
+            knps = f'{nodes / think_time / 1000:.1f}' if nodes and think_time else '-'
+            first = f'{1000 * first_proposal / proposed:.1f}' if proposed else '-'
+            hit_rate = f'{tt_hits / tt_probes:.1%}' if tt_probes else '-'
+            name = f'P{player_number} {names.get(player_number, "")}'
+            lines.append(f'{name:<20}{board_size:>6}{moves:>7.0f}{knps:>8}{depth / moves:>7.1f}{max_depth:>5.0f}'
+                         f'{first:>10}{proposals / moves:>7.1f}{hit_rate:>8}')
+        return lines
@@ -0,0 +1,217 @@
+"""
+Persistent player processes for the game simulators. Instead of starting a new process for every move, each player
+runs in a single worker process for the whole game. The worker keeps its own copy of the game state, which is updated
+with the moves played since its previous turn, and the same SudokuAI object is used for every move, such that an AI
+can keep caches across turns. At the deadline the worker is interrupted with a signal instead of being killed.
+"""
+
+import copy
+import multiprocessing
+import os
+import random
+import signal
+import time
+from typing import Optional, Union
+from competitive_sudoku.profiler import start_profiler
+from competitive_sudoku.scheduler import pin_to_core
+from competitive_sudoku.sharedmove import SharedMove
+from competitive_sudoku.sudoku import GameState, TabooMove
+from competitive_sudoku.sudokuai import SudokuAI
+
+INTERRUPT_TIMEOUT = 1.0  # The time in seconds a worker gets to stop thinking after it is interrupted
+POLL_INTERVAL = 0.005  # The interval in seconds at which a player is checked for a final move
+
+
+class ThinkingInterrupted(Exception):
+    """Raised inside a worker process when the time for computing a move is over."""
+
+
+def is_supported() -> bool:
+    """
+    Checks whether persistent player processes can be used on this platform, i.e. whether SIGUSR1 is available.
+    @return: True if PlayerWorker can be used.
+    """
+    return hasattr(signal, 'SIGUSR1')
+
+
+def has_final_move(player: SudokuAI) -> bool:
+    """
+    Checks whether a player has proposed a final move, see SudokuAI.propose_final_move.
+    @param player: The AI of a player.
+    @return: True if the best move of the player is final.
+    """
+    return isinstance(player.best_move, SharedMove) and player.best_move.is_final()
+
+
+def wait_for_player(process: multiprocessing.Process, player: SudokuAI, calculation_time: float) -> None:
+    """
+    Waits until a player process has exited or has proposed a final move, but at most calculation_time seconds.
+    @param process: The process that runs compute_best_move of the player.
+    @param player: The AI of the player.
+    @param calculation_time: The amount of time in seconds for computing the best move.
+    """
+    deadline = time.perf_counter() + calculation_time
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0 or has_final_move(player):
+            return
+        process.join(min(POLL_INTERVAL, remaining))
+        if process.exitcode is not None:
+            return
+
+
+def compute_move(player: SudokuAI, game_state: GameState, core: Optional[int] = None, seed: Union[int, str, None] = None, profile: Optional[str] = None) -> None:
+    """
+    The target of a process that computes a single move.
+    @param player: The AI of the player.
+    @param game_state: The current game state.
+    @param core: The CPU core to which the process is pinned, or None.
+    @param seed: The seed of the random generator of the process, or None.
+    @param profile: The directory to which a sampling profile of the process is written, or None.
+    """
+    pin_to_core(core)
+    if seed is not None:
+        random.seed(seed)
+    profiler = start_profiler(player, profile)
+    player.compute_best_move(game_state)
+    if profiler:
+        profiler.stop()
+
+
+def update_game_state(game_state: GameState, moves, scores) -> None:
+    """
+    Brings the copy of the game state of a worker up to date.
+    @param game_state: The game state of the worker.
+    @param moves: The moves that were played since the previous update.
+    @param scores: The current scores.
+    """
+    for move in moves:
+        if isinstance(move, TabooMove):
+            game_state.add_taboo_move(move)
+        else:
+            game_state.board.put(move.i, move.j, move.value)
+        game_state.moves.append(move)
+    game_state.scores = list(scores)
+
+
+def worker_main(player: SudokuAI, game_state: GameState, connection, core: Optional[int] = None, seed: Union[int, str, None] = None, profile: Optional[str] = None) -> None:
+    """
+    The main loop of a worker process. It handles the commands ('think', moves, scores, deadline) and ('stop',). After every
+    'think' command, 'done' is sent back, either when compute_best_move returns or when it is interrupted.
+    @param player: The AI of the player.
+    @param game_state: The game state at the start of the game.
+    @param connection: The worker end of the pipe to the simulator.
+    @param core: The CPU core to which the worker is pinned, or None.
+    @param seed: The seed of the random generator of the worker, or None.
+    @param profile: The directory to which a sampling profile of the worker is written, or None.
+    """
+    pin_to_core(core)
+    if seed is not None:
+        random.seed(seed)
+    profiler = start_profiler(player, profile)
+    thinking = [False]
+
+    def interrupt(signum, frame):
+        # Signals that arrive when the player is not thinking are ignored
+        if thinking[0]:
+            thinking[0] = False
+            raise ThinkingInterrupted()
+
+    signal.signal(signal.SIGUSR1, interrupt)
+    while True:
+        command = connection.recv()
+        if command[0] == 'stop':
+            break
+        _, moves, scores, player.deadline = command
+        update_game_state(game_state, moves, scores)
+        # The AI may modify the game state it gets, and can be interrupted halfway, so it works on a copy
+        state = copy.deepcopy(game_state)
+        try:
+            thinking[0] = True
+            player.compute_best_move(state)
+            thinking[0] = False
+        except ThinkingInterrupted:
+            pass
+        except Exception as err:
+            thinking[0] = False
+            print('Error: an exception occurred.\n', err)
+        connection.send('done')
+    if profiler:
+        profiler.stop()
+
+
+class PlayerWorker(object):
+    """
+    A SudokuAI that runs in a persistent process. The shared best_move and lock of the player must be set before
+    the worker is created.
+    """
+
+    def __init__(self, player: SudokuAI, game_state: GameState, core: Optional[int] = None, seed: Union[int, str, None] = None, profile: Optional[str] = None):
+        """
+        Starts the worker process.
+        @param player: The AI of the player.
+        @param game_state: The game state at the start of the game.
+        @param core: The CPU core to which the worker is pinned, or None.
+        @param seed: The seed of the random generator of the worker, or None.
+        @param profile: The directory to which a sampling profile of the worker is written, or None.
+        """
+        if not is_supported():
+            raise RuntimeError('Persistent player processes require SIGUSR1, which is not available on this platform')
+        self.player = player
+        self.connection, worker_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=worker_main, args=(player, game_state, worker_connection, core, seed, profile), daemon=True)
+        self.process.start()
+        worker_connection.close()
+        self.synchronized_moves = len(game_state.moves)
+
+    def think(self, game_state: GameState, calculation_time: float) -> None:
+        """
+        Lets the player compute a move in the given game state. Returns when the player is done, or when it has
+        proposed a final move or calculation_time seconds have passed, in which case the player is interrupted.
+        @param game_state: The current game state.
+        @param calculation_time: The amount of time in seconds for computing the best move.
+        """
+        moves = game_state.moves[self.synchronized_moves:]
+        self.synchronized_moves = len(game_state.moves)
+        # the deadline is sent as a time.monotonic() value, which is the same in all processes
+        self.connection.send(('think', moves, game_state.scores, time.monotonic() + calculation_time))
+        deadline = time.perf_counter() + calculation_time
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or has_final_move(self.player):
+                break
+            if self.connection.poll(min(POLL_INTERVAL, remaining)):
+                self.connection.recv()
+                return
+        lock = self.player.lock
+        if lock:
+            lock.acquire()
+        try:
+            os.kill(self.process.pid, signal.SIGUSR1)
+            if not self.connection.poll(INTERRUPT_TIMEOUT):
+                self.process.terminate()
+                raise RuntimeError('The player process did not respond to the interrupt, and was terminated')
+            self.connection.recv()
+        finally:
+            if lock:
+                lock.release()
+
+    def close(self) -> None:
+        """
+        Stops the worker process.
+        """
+        if self.process.is_alive():
+            try:
+                self.connection.send(('stop',))
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(1.0)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+"""Usage:
+    python simulate_game_bulk.py --first=team37_A2 --second=greedy_player --board=boards/hard-3x3.txt --iter=100 --record=games.jsonl
+    python replay_game.py games.jsonl --output=rescored.jsonl
+
+    Re-validates and re-scores recorded games with the oracle, without running the AIs, and reports the games of which
+    the result changed.
+    """
+
+import argparse
+import time
+from competitive_sudoku.execute import default_solve_sudoku_path, start_oracle_server, PYTHON_ORACLE, SERVER_ORACLE
+from competitive_sudoku.gamerecord import read_records, replay, write_record
+
+
+def main():
+    cmdline_parser = argparse.ArgumentParser(description='Script for replaying recorded competitive sudoku games.')
+    cmdline_parser.add_argument('records', metavar='FILE', type=str, nargs='+', help='JSON lines files with game records')
+    cmdline_parser.add_argument('--oracle', metavar='PATH', type=str, help=f"the location of the solve_sudoku executable, '{PYTHON_ORACLE}' for the in-process oracle, or '{SERVER_ORACLE}' for one in-process oracle server that is shared by all players (default: bin/solve_sudoku if it exists, otherwise {PYTHON_ORACLE})")
+    cmdline_parser.add_argument('--output', metavar='FILE', type=str, help='append the re-scored records to FILE')
+    cmdline_parser.add_argument('--verbose', help="print the result of every game", action='store_true')
+    args = cmdline_parser.parse_args()
+    solve_sudoku_path = start_oracle_server(args.oracle if args.oracle else default_solve_sudoku_path())
+
+    start = time.perf_counter()
+    games = 0
+    changed = 0
+    moves = 0
+    for filename in args.records:
+        for k, record in enumerate(read_records(filename)):
+            replayed = replay(record, solve_sudoku_path)
+            games += 1
+            moves += len(record.moves)
+            if replayed.result != record.result or replayed.moves != record.moves:
+                changed += 1
+                print(f'{filename}:{k + 1}: {record.first} - {record.second}: recorded {record.result}, replayed {replayed.result}')
+            elif args.verbose:
+                print(f'{filename}:{k + 1}: {record.first} - {record.second}: {replayed.result}')
+            if args.output:
+                write_record(args.output, replayed)
+    elapsed = time.perf_counter() - start
+    print(f'Replayed {games} games with {moves} moves in {elapsed:.2f}s; {changed} games changed')
+
+
+if __name__ == '__main__':
+    main()
@@ -5,15 +5,22 @@
 #  https://www.gnu.org/licenses/gpl-3.0.txt)
 
 import argparse
+import contextlib
 import importlib
 import multiprocessing
-import platform
-import re
 import time
 from pathlib import Path
-from competitive_sudoku.execute import solve_sudoku
-from competitive_sudoku.sudoku import GameState, SudokuBoard, Move, TabooMove, load_sudoku_from_text
+from typing import Optional
+from competitive_sudoku import profiler, worker
+from competitive_sudoku.execute import solve_sudoku, default_solve_sudoku_path, start_oracle_server, PYTHON_ORACLE, SERVER_ORACLE
+from competitive_sudoku.sudoku import GameState, SudokuBoard, Move, load_sudoku_from_text
+from competitive_sudoku.referee import judge_move, TABOO, INVALID, ILLEGAL
+from competitive_sudoku.sharedmove import SharedMove
 from competitive_sudoku.sudokuai import SudokuAI
+from competitive_sudoku.telemetry import Telemetry
+from competitive_sudoku.worker import PlayerWorker, compute_move, wait_for_player
+
+MISTAKE_DESCRIPTIONS = {TABOO: 'a taboo move', INVALID: 'not a valid move', ILLEGAL: 'not a legal move'}  # See judge_move
 
 
 def check_oracle(solve_sudoku_path: str) -> None:
@@ -32,7 +39,7 @@ def check_oracle(solve_sudoku_path: str) -> None:
         print(output)
 
 
-def simulate_game(initial_board: SudokuBoard, player1: SudokuAI, player2: SudokuAI, solve_sudoku_path: str, calculation_time: float = 0.5) -> None:
+def simulate_game(initial_board: SudokuBoard, player1: SudokuAI, player2: SudokuAI, solve_sudoku_path: str, calculation_time: float = 0.5, persistent: bool = False, profile: Optional[str] = None) -> None:
     """
     Simulates a game between two instances of SudokuAI, starting in initial_board. The first move is played by player1.
     @param initial_board: The initial position of the game.
@@ -40,76 +47,70 @@ def simulate_game(initial_board: SudokuBoard, player1: SudokuAI, player2: Sudoku
     @param player2: The AI of the second player.
     @param solve_sudoku_path: The location of the oracle executable.
     @param calculation_time: The amount of time in seconds for computing the best move.
+    @param persistent: Run each player in a single process for the whole game, see competitive_sudoku.worker.
+    @param profile: The directory to which sampling profiles of the player processes are written, or None.
     """
     import copy
     N = initial_board.N
 
     game_state = GameState(initial_board, copy.deepcopy(initial_board), [], [], [0, 0])
     move_number = 0
-    number_of_moves = initial_board.squares.count(SudokuBoard.empty)
+    number_of_moves = initial_board.empty_count
     print('Initial state')
     print(game_state)
 
-    with multiprocessing.Manager() as manager:
-        # use a lock to protect assignments to best_move
-        lock = multiprocessing.Lock()
-        player1.lock = lock
-        player2.lock = lock
-
-        # use shared variables to store the best move
-        player1.best_move = manager.list([0, 0, 0])
-        player2.best_move = manager.list([0, 0, 0])
+    with contextlib.ExitStack() as stack:
+        # use shared memory to store the best move; it is updated atomically, so no lock is needed
+        player1.lock = None
+        player2.lock = None
+        player1.best_move = SharedMove()
+        player2.best_move = SharedMove()
+        player1.telemetry = Telemetry()
+        player2.telemetry = Telemetry()
+
+        # start a persistent process for each player
+        workers = {}
+        if persistent:
+            workers[1] = stack.enter_context(PlayerWorker(player1, game_state, profile=profile))
+            workers[2] = stack.enter_context(PlayerWorker(player2, game_state, profile=profile))
 
         while move_number < number_of_moves:
             player, player_number = (player1, 1) if len(game_state.moves) % 2 == 0 else (player2, 2)
             print(f'-----------------------------\nCalculate a move for player {player_number}')
-            player.best_move[0] = 0
-            player.best_move[1] = 0
-            player.best_move[2] = 0
+            player.best_move.store(0, 0, 0)
+            player.telemetry.reset()
+            player.deadline = time.monotonic() + calculation_time
             try:
-                process = multiprocessing.Process(target=player.compute_best_move, args=(game_state,))
-                process.start()
-                time.sleep(calculation_time)
-                lock.acquire()
-                process.terminate()
-                lock.release()
+                if persistent:
+                    workers[player_number].think(game_state, calculation_time)
+                else:
+                    process = multiprocessing.Process(target=compute_move, args=(player, game_state, None, None, profile))
+                    process.start()
+                    wait_for_player(process, player, calculation_time)
+                    process.terminate()
+                    if profile:
+                        # wait until the profile is written
+                        process.join()
             except Exception as err:
                 print('Error: an exception occurred.\n', err)
             i, j, value = player.best_move
             best_move = Move(i, j, value)
             print(f'Best move: {best_move}')
-            player_score = 0
-            if best_move != Move(0, 0, 0):
-                if TabooMove(i, j, value) in game_state.taboo_moves:
-                    print(f'Error: {best_move} is a taboo move. Player {2-player_number} wins the game.')
-                    return
-                board_text = str(game_state.board)
-                options = f'--move "{game_state.board.rc2f(i, j)} {value}"'
-                output = solve_sudoku(solve_sudoku_path, board_text, options)
-                if 'Invalid move' in output:
-                    print(f'Error: {best_move} is not a valid move. Player {3-player_number} wins the game.')
-                    return
-                if 'Illegal move' in output:
-                    print(f'Error: {best_move} is not a legal move. Player {3-player_number} wins the game.')
-                    return
-                if 'has no solution' in output:
-                    print(f'The sudoku has no solution after the move {best_move}.')
-                    player_score = 0
-                    game_state.moves.append(TabooMove(i, j, value))
-                    game_state.taboo_moves.append(TabooMove(i, j, value))
-                if 'The score is' in output:
-                    match = re.search(r'The score is ([-\d]+)', output)
-                    if match:
-                        player_score = int(match.group(1))
-                        game_state.board.put(i, j, value)
-                        game_state.moves.append(best_move)
-                        move_number = move_number + 1
-                    else:
-                        raise RuntimeError(f'Unexpected output of sudoku solver: "{output}".')
-            else:
+            nodes, depth, first_proposal, proposals, tt_probes, tt_hits = player.telemetry.snapshot()
+            if proposals:
+                print(f'Search: {nodes:.0f} nodes, depth {depth:.0f}, {proposals:.0f} proposals, first after {1000 * first_proposal:.1f}ms'
+                      + (f', {tt_hits / tt_probes:.1%} transposition table hits' if tt_probes else ''))
+            if best_move == Move(0, 0, 0):
                 print(f'No move was supplied. Player {3-player_number} wins the game.')
                 return
-            game_state.scores[player_number-1] = game_state.scores[player_number-1] + player_score
+            mistake, player_score, taboo = judge_move(game_state, best_move, solve_sudoku_path)
+            if mistake:
+                print(f'Error: {best_move} is {MISTAKE_DESCRIPTIONS[mistake]}. Player {3-player_number} wins the game.')
+                return
+            if taboo:
+                print(f'The sudoku has no solution after the move {best_move}.')
+            else:
+                move_number = move_number + 1
             print(f'Reward: {player_score}')
             print(game_state)
         if game_state.scores[0] > game_state.scores[1]:
@@ -121,15 +122,17 @@ def simulate_game(initial_board: SudokuBoard, player1: SudokuAI, player2: Sudoku
 
 
 def main():
-    solve_sudoku_path = 'bin\\solve_sudoku.exe' if platform.system() == 'Windows' else 'bin/solve_sudoku'
-
     cmdline_parser = argparse.ArgumentParser(description='Script for simulating a competitive sudoku game.')
     cmdline_parser.add_argument('--first', help="the module name of the first player's SudokuAI class (default: random_player)", default='random_player')
     cmdline_parser.add_argument('--second', help="the module name of the second player's SudokuAI class (default: random_player)", default='random_player')
     cmdline_parser.add_argument('--time', help="the time (in seconds) for computing a move (default: 0.5)", type=float, default=0.5)
     cmdline_parser.add_argument('--check', help="check if the solve_sudoku program works", action='store_true')
     cmdline_parser.add_argument('--board', metavar='FILE', type=str, help='a text file containing the start position')
+    cmdline_parser.add_argument('--oracle', metavar='PATH', type=str, help=f"the location of the solve_sudoku executable, '{PYTHON_ORACLE}' for the in-process oracle, or '{SERVER_ORACLE}' for one in-process oracle server that is shared by all players (default: bin/solve_sudoku if it exists, otherwise {PYTHON_ORACLE})")
+    cmdline_parser.add_argument('--profile', metavar='DIR', type=str, help="profile the player processes with a sampling profiler, and write the collapsed stacks of every engine to DIR/<engine>.folded (requires SIGPROF)")
+    cmdline_parser.add_argument('--persistent', help="run each player in a single process for the whole game, instead of a new process per move (requires SIGUSR1)", action='store_true')
     args = cmdline_parser.parse_args()
+    solve_sudoku_path = start_oracle_server(args.oracle if args.oracle else default_solve_sudoku_path())
 
     if args.check:
         check_oracle(solve_sudoku_path)
@@ -154,7 +157,20 @@ def main():
     if args.second in ('random_player', 'greedy_player'):
         player2.solve_sudoku_path = solve_sudoku_path
 
-    simulate_game(board, player1, player2, solve_sudoku_path=solve_sudoku_path, calculation_time=args.time)
+    if args.persistent and not worker.is_supported():
+        print('Error: persistent player processes require SIGUSR1, which is not available on this platform. Run without --persistent.')
+        return
+    if args.profile:
+        if not profiler.is_supported():
+            print('Error: profiling requires SIGPROF, which is not available on this platform.')
+            return
+        Path(args.profile).mkdir(parents=True, exist_ok=True)
+
+    simulate_game(board, player1, player2, solve_sudoku_path=solve_sudoku_path, calculation_time=args.time, persistent=args.persistent, profile=args.profile)
+
+    if args.profile:
+        for engine, samples in profiler.merge_profiles(args.profile).items():
+            print(f'Profile of {engine}: {samples} samples in {Path(args.profile) / (engine + ".folded")}')
 
 
 if __name__ == '__main__':
@@ -12,22 +12,36 @@
 
     python simulate_game_bulk.py --first=team37_A2 --second=greedy_player --board=boards/empty-4x4.txt --iter=10 --workers=3 --time=1 >> bulk_empty4x4
 
+    python simulate_game_bulk.py --first=team37_A2 --second=team37_A1 --board=boards/empty-3x3.txt --iter=1000 --time=1 --sprt 0 50
+    (stops as soon as the test decides whether team37_A2 is 50 Elo stronger than team37_A1, or not stronger at all)
+
     """
 
 import argparse
+import contextlib
 import importlib
 import multiprocessing
 from os import sep
 import logging
-import platform
-import re
+import random
+import threading
 import time
 import concurrent.futures as cf
 from pathlib import Path
-from typing import Counter
-from competitive_sudoku.execute import solve_sudoku
-from competitive_sudoku.sudoku import GameState, SudokuBoard, Move, TabooMove, load_sudoku_from_text
+from typing import Counter, Optional
+from competitive_sudoku.execute import solve_sudoku, default_solve_sudoku_path, start_oracle_server, PYTHON_ORACLE, SERVER_ORACLE
+from competitive_sudoku.sudoku import GameState, SudokuBoard, Move, load_sudoku_from_text
+from competitive_sudoku.gamerecord import GameRecord, write_record
+from competitive_sudoku.referee import judge_move
+from competitive_sudoku.sharedmove import SharedMove
 from competitive_sudoku.sudokuai import SudokuAI
+from competitive_sudoku import profiler, worker
+from competitive_sudoku.telemetry import Telemetry, TelemetrySummary
+from competitive_sudoku.ratings import sprt_bounds, sprt_llr
+from competitive_sudoku.scheduler import CorePool, available_cores, oversubscription_warning
+from competitive_sudoku.worker import PlayerWorker, compute_move, wait_for_player
+
+_record_lock = threading.Lock()  # Serializes writing game records from concurrent games
 
 # Prevent unwanted logging messages from AI module
 logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.WARNING) 
@@ -49,7 +63,7 @@ def check_oracle(solve_sudoku_path: str) -> None:
         print(output)
 
 
-def simulate_game(initial_board: SudokuBoard, player1: SudokuAI, player2: SudokuAI, solve_sudoku_path: str, calculation_time: float = 0.5, match_number=None) -> None:
+def simulate_game(initial_board: SudokuBoard, player1: SudokuAI, player2: SudokuAI, solve_sudoku_path: str, calculation_time: float = 0.5, match_number=None, persistent: bool = False, core: Optional[int] = None, seed: Optional[int] = None, record: Optional[GameRecord] = None, telemetry: Optional[TelemetrySummary] = None, profile: Optional[str] = None) -> None:
     """
     Simulates a game between two instances of SudokuAI, starting in initial_board. The first move is played by player1.
     @param initial_board: The initial position of the game.
@@ -57,6 +71,12 @@ def simulate_game(initial_board: SudokuBoard, player1: SudokuAI, player2: Sudoku
     @param player2: The AI of the second player.
     @param solve_sudoku_path: The location of the oracle executable.
     @param calculation_time: The amount of time in seconds for computing the best move.
+    @param persistent: Run each player in a single process for the whole game, see competitive_sudoku.worker.
+    @param core: The CPU core to which the player processes are pinned, or None.
+    @param seed: The seed of the random generators of the player processes, or None.
+    @param record: A game record to which the moves and the result are added, or None.
+    @param telemetry: A summary to which the search telemetry of the players is added, or None.
+    @param profile: The directory to which sampling profiles of the player processes are written, or None.
     """
     if match_number is not None:
         print("Started match", match_number)
@@ -65,89 +85,152 @@ def simulate_game(initial_board: SudokuBoard, player1: SudokuAI, player2: Sudoku
     
 
     game_state = GameState(initial_board, copy.deepcopy(initial_board), [], [], [0, 0])
-    move_number = 0
-    number_of_moves = initial_board.squares.count(SudokuBoard.empty)
     # print('Initial state')
     # print(game_state)
 
-    with multiprocessing.Manager() as manager:
-        # use a lock to protect assignments to best_move
-        lock = multiprocessing.Lock()
-        player1.lock = lock
-        player2.lock = lock
+    def finish(result):
+        if record is not None:
+            record.result = result
+        return result
 
-        # use shared variables to store the best move
-        player1.best_move = manager.list([0, 0, 0])
-        player2.best_move = manager.list([0, 0, 0])
+    with contextlib.ExitStack() as stack:
+        # use shared memory to store the best move; it is updated atomically, so no lock is needed
+        player1.lock = None
+        player2.lock = None
+        player1.best_move = SharedMove()
+        player2.best_move = SharedMove()
+        player1.telemetry = Telemetry()
+        player2.telemetry = Telemetry()
+        board_size = f'{initial_board.m}x{initial_board.n}'
 
-        while move_number < number_of_moves:
+        # start a persistent process for each player
+        workers = {}
+        if persistent:
+            workers[1] = stack.enter_context(PlayerWorker(player1, game_state, core, None if seed is None else f'{seed}:1', profile))
+            workers[2] = stack.enter_context(PlayerWorker(player2, game_state, core, None if seed is None else f'{seed}:2', profile))
+
+        while game_state.board.empty_count > 0:
             player, player_number = (player1, 1) if len(game_state.moves) % 2 == 0 else (player2, 2)
             # print(f'-----------------------------\nCalculate a move for player {player_number}')
-            player.best_move[0] = 0
-            player.best_move[1] = 0
-            player.best_move[2] = 0
+            player.best_move.store(0, 0, 0)
+            player.telemetry.reset()
+            player.deadline = time.monotonic() + calculation_time
+            start = time.perf_counter()
             try:
-                process = multiprocessing.Process(target=player.compute_best_move, args=(game_state,))
-                process.start()
-                time.sleep(calculation_time)
-                lock.acquire()
-                process.terminate()
-                lock.release()
+                if persistent:
+                    workers[player_number].think(game_state, calculation_time)
+                else:
+                    process = multiprocessing.Process(target=compute_move, args=(player, game_state, core, None if seed is None else f'{seed}:{len(game_state.moves)}', profile))
+                    process.start()
+                    wait_for_player(process, player, calculation_time)
+                    process.terminate()
+                    if profile:
+                        # wait until the profile is written
+                        process.join()
             except Exception as err:
                 print('Error: an exception occurred.\n', err)
+            think_time = time.perf_counter() - start
+            if telemetry is not None:
+                telemetry.add(player_number, board_size, player.telemetry.snapshot(), think_time)
             i, j, value = player.best_move
             best_move = Move(i, j, value)
             # print(f'Best move: {best_move}')
-            player_score = 0
-            if best_move != Move(0, 0, 0):
-                if TabooMove(i, j, value) in game_state.taboo_moves:
-                    # print(f'Error: {best_move} is a taboo move. Player {2-player_number} wins the game.')
-                    return f"Player {player_number} made TABOO move"
-                board_text = str(game_state.board)
-                options = f'--move "{game_state.board.rc2f(i, j)} {value}"'
-                output = solve_sudoku(solve_sudoku_path, board_text, options)
-                if 'Invalid move' in output:
-                    # print(f'Error: {best_move} is not a valid move. Player {3-player_number} wins the game.')
-                    return f"Player {player_number} made INVALID move"
-                if 'Illegal move' in output:
-                    # print(f'Error: {best_move} is not a legal move. Player {3-player_number} wins the game.')
-                    return f"Player {player_number} made ILLEGAL move"
-                if 'has no solution' in output:
-                    # print(f'The sudoku has no solution after the move {best_move}.')
-                    player_score = 0
-                    game_state.moves.append(TabooMove(i, j, value))
-                    game_state.taboo_moves.append(TabooMove(i, j, value))
-                if 'The score is' in output:
-                    match = re.search(r'The score is ([-\d]+)', output)
-                    if match:
-                        player_score = int(match.group(1))
-                        game_state.board.put(i, j, value)
-                        game_state.moves.append(best_move)
-                        move_number = move_number + 1
-                    else:
-                        raise RuntimeError(f'Unexpected output of sudoku solver: "{output}".')
-            else:
+            if best_move == Move(0, 0, 0):
                 # print(f'No move was supplied. Player {3-player_number} wins the game.')
-                return f"Player {player_number} was too slow"
-            game_state.scores[player_number-1] = game_state.scores[player_number-1] + player_score
+                if record is not None:
+                    record.add_move(i, j, value, False, 0, think_time)
+                return finish(f"Player {player_number} was too slow")
+            mistake, player_score, taboo = judge_move(game_state, best_move, solve_sudoku_path)
+            if record is not None:
+                record.add_move(i, j, value, taboo, player_score, think_time)
+            if mistake:
+                # print(f'Error: {best_move} is not a valid move. Player {3-player_number} wins the game.')
+                return finish(f"Player {player_number} made {mistake} move")
             # print(f'Reward: {player_score}')
             # print(game_state)
         # print('Final score: %d - %d' % (game_state.scores[0], game_state.scores[1]))
-        return game_state.scores
+        return finish(game_state.scores)
 
 
-def main():
-    solve_sudoku_path = 'bin\\solve_sudoku.exe' if platform.system() == 'Windows' else 'bin/solve_sudoku'
+def create_player(name: str, solve_sudoku_path: str) -> SudokuAI:
+    """
+    Creates the AI of a player.
+    @param name: The module name of the player's SudokuAI class.
+    @param solve_sudoku_path: The location of the oracle, which is used by random_player and greedy_player.
+    @return: A new SudokuAI object.
+    """
+    module = importlib.import_module(name + '.sudokuai')
+    player = module.SudokuAI()
+    if name in ('random_player', 'greedy_player'):
+        player.solve_sudoku_path = solve_sudoku_path
+    return player
 
+
+def create_core_pool(workers: int, oversubscribe: bool = False, no_pin: bool = False) -> Optional[CorePool]:
+    """
+    Creates the pool of cores from which every game gets a dedicated core, unless the machine is oversubscribed. In
+    that case the games run without pinning, with a warning unless oversubscribe is set.
+    @param workers: The number of concurrent games.
+    @param oversubscribe: Run more concurrent games than available cores without a warning.
+    @param no_pin: Do not pin the player processes to cores.
+    @return: A pool of cores, or None if the player processes are not pinned.
+    """
+    warning = oversubscription_warning(workers, available_cores())
+    if warning and not oversubscribe:
+        print(f'Warning: {warning}; the player processes are not pinned to cores. Use fewer --workers, or pass '
+              f'--oversubscribe to hide this warning.')
+    return CorePool(available_cores()) if not (warning or no_pin) else None
+
+
+def play_game(initial_board: SudokuBoard, first: str, second: str, solve_sudoku_path: str, calculation_time: float = 0.5, match_number=None, persistent: bool = False, core_pool: Optional[CorePool] = None, seed: Optional[int] = None, record_file: Optional[str] = None, telemetry: Optional[TelemetrySummary] = None, profile: Optional[str] = None):
+    """
+    Plays a game between two new players on a core of core_pool, see simulate_game.
+    @param first: The module name of the first player.
+    @param second: The module name of the second player.
+    @param core_pool: The pool of cores to take a core from for the duration of the game, or None.
+    @param record_file: The name of a file to which the record of the game is appended, or None.
+    @param telemetry: A summary to which the search telemetry of the players is added, or None.
+    @param profile: The directory to which sampling profiles of the player processes are written, or None.
+    @return: The scores of the game, or a string describing the mistake that ended it.
+    """
+    if record_file and seed is None:
+        seed = random.randrange(2**31)
+    record = GameRecord(initial_board, first, second, calculation_time, seed) if record_file else None
+    core = core_pool.acquire() if core_pool else None
+    try:
+        player1 = create_player(first, solve_sudoku_path)
+        player2 = create_player(second, solve_sudoku_path)
+        result = simulate_game(initial_board, player1, player2, solve_sudoku_path, calculation_time, match_number, persistent, core, seed, record, telemetry, profile)
+    finally:
+        if core_pool:
+            core_pool.release(core)
+    if record is not None:
+        with _record_lock:
+            write_record(record_file, record)
+    return result
+
+
+def main():
     cmdline_parser = argparse.ArgumentParser(description='Script for simulating a competitive sudoku game.')
     cmdline_parser.add_argument('--first', help="the module name of the first player's SudokuAI class (default: random_player)", default='random_player')
     cmdline_parser.add_argument('--second', help="the module name of the second player's SudokuAI class (default: random_player)", default='random_player')
     cmdline_parser.add_argument('--time', help="the time (in seconds) for computing a move (default: 0.5)", type=float, default=0.5)
     cmdline_parser.add_argument('--check', help="check if the solve_sudoku program works", action='store_true')
-    cmdline_parser.add_argument('--board', metavar='FILE', type=str, help='a text file containing the start position')
-    cmdline_parser.add_argument('--iter', type=int, default=1, help="number of iterations to execute")
+    cmdline_parser.add_argument('--board', metavar='FILE', type=str, nargs='+', help='one or more text files containing start positions; every board is played --iter times')
+    cmdline_parser.add_argument('--oracle', metavar='PATH', type=str, help=f"the location of the solve_sudoku executable, '{PYTHON_ORACLE}' for the in-process oracle, or '{SERVER_ORACLE}' for one in-process oracle server that is shared by all players (default: bin/solve_sudoku if it exists, otherwise {PYTHON_ORACLE})")
+    cmdline_parser.add_argument('--iter', type=int, default=1, help="number of iterations to execute (the maximum number with --sprt)")
     cmdline_parser.add_argument('--workers', type=int, default=1, help="number of workers used for concurrent bulk solving")
+    cmdline_parser.add_argument('--persistent', help="run each player in a single process for the whole game, instead of a new process per move (requires SIGUSR1)", action='store_true')
+    cmdline_parser.add_argument('--no-pin', help="do not pin the player processes of every game to a dedicated CPU core", action='store_true')
+    cmdline_parser.add_argument('--record', metavar='FILE', type=str, help="append a record of every game to FILE, see competitive_sudoku.gamerecord and replay_game.py")
+    cmdline_parser.add_argument('--seed', type=int, help="the seed of the random generators of the players; game k uses seed + k")
+    cmdline_parser.add_argument('--profile', metavar='DIR', type=str, help="profile the player processes with a sampling profiler, and write the collapsed stacks of every engine to DIR/<engine>.folded (requires SIGPROF)")
+    cmdline_parser.add_argument('--sprt', metavar=('ELO0', 'ELO1'), type=float, nargs=2, help="stop as soon as a sequential probability ratio test decides between H0: first is ELO0 stronger than second, and H1: first is ELO1 stronger")
+    cmdline_parser.add_argument('--alpha', type=float, default=0.05, help="the false positive rate of --sprt (default: 0.05)")
+    cmdline_parser.add_argument('--beta', type=float, default=0.05, help="the false negative rate of --sprt (default: 0.05)")
+    cmdline_parser.add_argument('--oversubscribe', help="run more concurrent games than available CPU cores without a warning (pinning is disabled in that case)", action='store_true')
     args = cmdline_parser.parse_args()
+    solve_sudoku_path = start_oracle_server(args.oracle if args.oracle else default_solve_sudoku_path())
 
     if args.check:
         check_oracle(solve_sudoku_path)
@@ -159,30 +242,38 @@ def main():
        2   1   .   3
        .   .   .   1
     '''
-    if args.board:
-        board_text = Path(args.board).read_text()
-    board = load_sudoku_from_text(board_text)
-
-    module1 = importlib.import_module(args.first + '.sudokuai')
-    module2 = importlib.import_module(args.second + '.sudokuai')
-    player1 = [module1.SudokuAI() for _ in range(args.iter)]
-    player2 = [module2.SudokuAI() for _ in range(args.iter)]
-    if args.first in ('random_player', 'greedy_player'):
-        for i in range(args.iter):
-            player1[i].solve_sudoku_path = solve_sudoku_path
-    if args.second in ('random_player', 'greedy_player'):
-        for i in range(args.iter):
-            player2[i].solve_sudoku_path = solve_sudoku_path
-    
+    boards = [load_sudoku_from_text(Path(filename).read_text()) for filename in args.board] if args.board else [load_sudoku_from_text(board_text)]
+
+    if args.persistent and not worker.is_supported():
+        print('Error: persistent player processes require SIGUSR1, which is not available on this platform. Run without --persistent.')
+        return
+    if args.profile:
+        if not profiler.is_supported():
+            print('Error: profiling requires SIGPROF, which is not available on this platform.')
+            return
+        Path(args.profile).mkdir(parents=True, exist_ok=True)
+    core_pool = create_core_pool(args.workers, args.oversubscribe, args.no_pin)
+
+    # queue the games with the most moves first, such that the slowest games do not end up last
+    games = [board for board in boards for _ in range(args.iter)]
+    games.sort(key=lambda board: board.empty_count, reverse=True)
+    matches = len(games)
+
     won = 0
     lost = 0
     draw = 0
     mistakes = Counter()
     none = 0
+    sprt_result = None
+    if args.sprt:
+        lower, upper = sprt_bounds(args.alpha, args.beta)
+    telemetry = TelemetrySummary()
 
     with cf.ThreadPoolExecutor(args.workers) as executor:
-        results = [executor.submit(simulate_game, board, player1[i], player2[i], solve_sudoku_path, args.time, i) for i in range(args.iter)]
+        results = [executor.submit(play_game, board, args.first, args.second, solve_sudoku_path, args.time, i, args.persistent, core_pool, None if args.seed is None else args.seed + i, args.record, telemetry, args.profile) for i, board in enumerate(games)]
         for f in cf.as_completed(results):
+            if f.cancelled():
+                continue
             scores = f.result()
             print("A match finished with outcome: ", end='')
             if scores is None:
@@ -204,21 +295,44 @@ def main():
                 else: 
                     print("Draw! Score %d - %d" % (s1, s2))
                     draw += 1
+            if args.sprt and sprt_result is None:
+                # the player that made a mistake loses
+                forfeits1 = sum(value for key, value in mistakes.items() if key.startswith('Player 1'))
+                forfeits2 = sum(mistakes.values()) - forfeits1
+                llr = sprt_llr(won + forfeits2, draw, lost + forfeits1, *args.sprt)
+                if not lower < llr < upper:
+                    sprt_result = 'H1' if llr >= upper else 'H0'
+                    print(f"SPRT: {sprt_result} accepted after {won + draw + lost + forfeits1 + forfeits2} matches (LLR {llr:.2f})")
+                    # stop the matches that did not start yet; running matches are finished and counted
+                    for result in results:
+                        result.cancel()
+
+    if args.profile:
+        for engine, samples in profiler.merge_profiles(args.profile).items():
+            print(f'Profile of {engine}: {samples} samples in {Path(args.profile) / (engine + ".folded")}')
 
     column_width = 27
     spacer = " "*column_width
     print()
     print('-'*(column_width+7))
     print("Scoreboard:")
-    print(f"{args.iter} matches")
+    matches = won + draw + lost + sum(mistakes.values()) + none
+    print(f"{matches} matches")
     print('-'*(column_width+7))
-    print(spacer, f"\rP1 [ {args.first:^14}] wins: {won/args.iter:>6.1%}")
-    print(spacer, f"\r{'draw: ':>{column_width}} {draw/args.iter:>6.1%}")
-    print(spacer, f"\rP2 [ {args.second:^14}] wins: {lost/args.iter:>6.1%}")
+    print(spacer, f"\rP1 [ {args.first:^14}] wins: {won/matches:>6.1%}")
+    print(spacer, f"\r{'draw: ':>{column_width}} {draw/matches:>6.1%}")
+    print(spacer, f"\rP2 [ {args.second:^14}] wins: {lost/matches:>6.1%}")
     print('-'*(column_width+7))
     for key, value in mistakes.items():
-        print(spacer, f"{value/args.iter:>6.1%}\r{key}:")
-    print(spacer, f"\rAll else: {none/args.iter:>6.1%}")
+        print(spacer, f"{value/matches:>6.1%}\r{key}:")
+    print(spacer, f"\rAll else: {none/matches:>6.1%}")
+    print('-'*(column_width+7))
+    if args.sprt:
+        print(f"SPRT [{args.sprt[0]:g}, {args.sprt[1]:g}]: {sprt_result + ' accepted' if sprt_result else 'inconclusive'}")
+        print('-'*(column_width+7))
+    print("Search telemetry (averages per move):")
+    for line in telemetry.report({1: args.first, 2: args.second}):
+        print(line)
     print('-'*(column_width+7))
     print(
     f"P1:         {args.first}",
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+"""Usage:
+    python simulate_league.py --players team37_A1 team37_A2 greedy_player --board boards/empty-2x3.txt boards/hard-3x3.txt --iter=5 --workers=3 --time=1
+
+    Plays a round-robin league: every pair of players plays --iter games on every board in both seat orders. All
+    games are run in a single pool of workers, and the result is a crosstable and Elo ratings with 95% confidence
+    intervals.
+    """
+
+import argparse
+import concurrent.futures as cf
+import itertools
+import logging
+from collections import defaultdict
+from pathlib import Path
+from typing import Counter
+from competitive_sudoku import profiler, worker
+from competitive_sudoku.execute import default_solve_sudoku_path, start_oracle_server, PYTHON_ORACLE, SERVER_ORACLE
+from competitive_sudoku.ratings import fit_ratings
+from competitive_sudoku.sudoku import load_sudoku_from_text
+from simulate_game_bulk import create_core_pool, play_game
+
+# Prevent unwanted logging messages from AI module
+logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.WARNING)
+
+
+def game_score(outcome) -> float:
+    """
+    Computes the score of the first player of a game.
+    @param outcome: The result of simulate_game, i.e. the scores or a string describing a mistake of a player.
+    @return: 1 for a win of the first player, 0.5 for a draw and 0 for a loss. A player that makes a mistake loses.
+    """
+    if isinstance(outcome, str):
+        return 0.0 if outcome.startswith('Player 1') else 1.0
+    s1, s2 = outcome
+    return 1.0 if s1 > s2 else 0.0 if s1 < s2 else 0.5
+
+
+def main():
+    cmdline_parser = argparse.ArgumentParser(description='Script for simulating a round-robin league of competitive sudoku players.')
+    cmdline_parser.add_argument('--players', metavar='MODULE', type=str, nargs='+', required=True, help="the module names of the players' SudokuAI classes")
+    cmdline_parser.add_argument('--board', metavar='FILE', type=str, nargs='+', required=True, help='one or more text files containing start positions')
+    cmdline_parser.add_argument('--time', help="the time (in seconds) for computing a move (default: 0.5)", type=float, default=0.5)
+    cmdline_parser.add_argument('--oracle', metavar='PATH', type=str, help=f"the location of the solve_sudoku executable, '{PYTHON_ORACLE}' for the in-process oracle, or '{SERVER_ORACLE}' for one in-process oracle server that is shared by all players (default: bin/solve_sudoku if it exists, otherwise {PYTHON_ORACLE})")
+    cmdline_parser.add_argument('--iter', type=int, default=1, help="number of games per pair of players, board and seat order")
+    cmdline_parser.add_argument('--workers', type=int, default=1, help="number of games that are played concurrently")
+    cmdline_parser.add_argument('--persistent', help="run each player in a single process for the whole game, instead of a new process per move (requires SIGUSR1)", action='store_true')
+    cmdline_parser.add_argument('--record', metavar='FILE', type=str, help="append a record of every game to FILE, see competitive_sudoku.gamerecord and replay_game.py")
+    cmdline_parser.add_argument('--seed', type=int, help="the seed of the random generators of the players; game k uses seed + k")
+    cmdline_parser.add_argument('--profile', metavar='DIR', type=str, help="profile the player processes with a sampling profiler, and write the collapsed stacks of every engine to DIR/<engine>.folded (requires SIGPROF)")
+    cmdline_parser.add_argument('--no-pin', help="do not pin the player processes of every game to a dedicated CPU core", action='store_true')
+    cmdline_parser.add_argument('--oversubscribe', help="run more concurrent games than available CPU cores without a warning (pinning is disabled in that case)", action='store_true')
+    args = cmdline_parser.parse_args()
+    solve_sudoku_path = start_oracle_server(args.oracle if args.oracle else default_solve_sudoku_path())
+
+    if len(set(args.players)) < 2:
+        print('Error: a league needs at least two different players.')
+        return
+    if args.persistent and not worker.is_supported():
+        print('Error: persistent player processes require SIGUSR1, which is not available on this platform. Run without --persistent.')
+        return
+    if args.profile:
+        if not profiler.is_supported():
+            print('Error: profiling requires SIGPROF, which is not available on this platform.')
+            return
+        Path(args.profile).mkdir(parents=True, exist_ok=True)
+    core_pool = create_core_pool(args.workers, args.oversubscribe, args.no_pin)
+
+    boards = [(filename, load_sudoku_from_text(Path(filename).read_text())) for filename in args.board]
+    games = [(filename, board, first, second) for filename, board in boards
+             for first, second in itertools.permutations(dict.fromkeys(args.players), 2)
+             for _ in range(args.iter)]
+    # queue the games with the most moves first, such that the slowest games do not end up last
+    games.sort(key=lambda game: game[1].empty_count, reverse=True)
+    print(f'{len(games)} games')
+
+    results = []
+    points = defaultdict(float)  # points[(player, opponent)] is the total score of player against opponent
+    mistakes = Counter()
+    unfinished = 0
+    with cf.ThreadPoolExecutor(args.workers) as executor:
+        futures = {executor.submit(play_game, board, first, second, solve_sudoku_path, args.time, i, args.persistent, core_pool, None if args.seed is None else args.seed + i, args.record, None, args.profile): (filename, first, second)
+                   for i, (filename, board, first, second) in enumerate(games)}
+        for f in cf.as_completed(futures):
+            filename, first, second = futures[f]
+            outcome = f.result()
+            if outcome is None:
+                unfinished += 1
+                continue
+            if isinstance(outcome, str):
+                mistakes[(first if outcome.startswith('Player 1') else second, outcome.split(' ', 2)[2])] += 1
+            score = game_score(outcome)
+            print(f'{first} - {second} on {filename}: {score:g} - {1 - score:g}')
+            results.append((first, second, score))
+            points[(first, second)] += score
+            points[(second, first)] += 1 - score
+
+    if args.profile:
+        for engine, samples in profiler.merge_profiles(args.profile).items():
+            print(f'Profile of {engine}: {samples} samples in {Path(args.profile) / (engine + ".folded")}')
+
+    players = list(dict.fromkeys(args.players))
+    ratings = fit_ratings(results)
+    players.sort(key=lambda name: ratings.get(name, (0.0, 0.0))[0], reverse=True)
+    width = max(len(name) for name in players)
+    games_per_pair = 2 * args.iter * len(boards)
+
+    print()
+    print('Crosstable (points of the row player against the column player, out of %d games):' % games_per_pair)
+    print(' ' * (width + 2) + ' '.join(f'{k + 1:>6}' for k in range(len(players))))
+    for k, name in enumerate(players):
+        row = ' '.join(f'{"-":>6}' if other == name else f'{points[(name, other)]:>6g}' for other in players)
+        print(f'{k + 1:>2} {name:<{width}} {row}')
+    print()
+    print('Ratings (Elo, 95% confidence interval):')
+    for k, name in enumerate(players):
+        rating, interval = ratings.get(name, (0.0, float('inf')))
+        print(f'{k + 1:>2} {name:<{width}} {rating:>7.1f} +/- {interval:.1f}')
+    if mistakes:
+        print()
+        print('Mistakes:')
+        for (name, mistake), count in mistakes.items():
+            print(f'   {name:<{width}} {mistake}: {count}')
+    if unfinished:
+        print(f'{unfinished} games had no result')
+
+
+if __name__ == '__main__':
+    main()
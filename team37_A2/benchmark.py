@@ -0,0 +1,54 @@
+"""Usage:
+    python -m team37_A2.benchmark --board boards/easy-3x3.txt boards/random-3x3.txt --depth 4
+
+    Searches the start positions of the boards to a fixed depth with every search algorithm of team37_A2, and reports
+    the number of nodes, the time, and the best move.
+    """
+
+import argparse
+import copy
+import time
+from pathlib import Path
+
+from competitive_sudoku.sudoku import GameState, load_sudoku_from_text
+from team37_A2.sudokuai import SudokuAI, ALPHABETA, PVS
+
+
+def benchmark(board_file: str, search: str, depth: int):
+    """
+    Search the start position of a board to a fixed depth.
+    @param board_file: A text file containing the start position
+    @param search: The search algorithm, ALPHABETA or PVS
+    @param depth: The depth of the search
+    @return: A tuple (nodes, seconds, player) with the player after the search, of which best_move is the result
+    """
+    board = load_sudoku_from_text(Path(board_file).read_text())
+    game_state = GameState(board, copy.deepcopy(board), [], [], [0, 0])
+    player = SudokuAI(search=search, max_depth=depth)
+    start = time.perf_counter()
+    player.compute_best_move(game_state)
+    return player.nodes, time.perf_counter() - start, player
+
+
+def main():
+    cmdline_parser = argparse.ArgumentParser(description='Script for comparing the search algorithms of team37_A2.')
+    cmdline_parser.add_argument('--board', metavar='FILE', type=str, nargs='+', help='text files containing the start positions (default: boards/*.txt)')
+    cmdline_parser.add_argument('--depth', type=int, help='the depth of the search (default: 4)', default=4)
+    cmdline_parser.add_argument('--search', type=str, nargs='+', choices=[ALPHABETA, PVS], help='the search algorithms to compare (default: all)', default=[ALPHABETA, PVS])
+    args = cmdline_parser.parse_args()
+    boards = args.board if args.board else sorted(str(path) for path in Path('boards').glob('*.txt'))
+
+    totals = {search: 0 for search in args.search}
+    print(f'{"board":24} {"search":10} {"nodes":>10} {"time":>8} {"knps":>6}  best move')
+    for board_file in boards:
+        for search in args.search:
+            nodes, seconds, player = benchmark(board_file, search, args.depth)
+            totals[search] += nodes
+            i, j, value = player.best_move
+            print(f'{Path(board_file).name:24} {search:10} {nodes:10} {seconds:7.2f}s {nodes / seconds / 1000:6.1f}  ({i},{j}) -> {value}')
+    for search in args.search:
+        print(f'Total {search}: {totals[search]} nodes')
+
+
+if __name__ == '__main__':
+    main()
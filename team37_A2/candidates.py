@@ -0,0 +1,132 @@
+import functools
+
+from competitive_sudoku.sudoku import Move, SudokuBoard, popcount
+
+
+@functools.lru_cache(maxsize=None)
+def square_peers(m: int, n: int):
+    """
+    Compute the peers of every square, i.e. the other squares in its row, column and block.
+    @param m: The number of rows of a block
+    @param n: The number of columns of a block
+    @return: A tuple with for every square index k = i * N + j a tuple of the indices of its peers
+    """
+    N = m * n
+    peers = []
+    for i in range(N):
+        for j in range(N):
+            block = {(p, q) for p in range(i - i % m, i - i % m + m) for q in range(j - j % n, j - j % n + n)}
+            cells = {(i, q) for q in range(N)} | {(p, j) for p in range(N)} | block
+            cells.discard((i, j))
+            peers.append(tuple(sorted(p * N + q for p, q in cells)))
+    return tuple(peers)
+
+
+class CandidateCache(object):
+    """A CandidateCache keeps the candidate values of every empty square of a board as a bitmask (bit v - 1 for value v),
+    and the empty squares bucketed by their number of candidates. When a square is filled in, only the candidates of its
+    peers change, so both are updated incrementally by play and restored by unplay. A bucket is a bitset of square
+    indices, so its squares are kept in row-major order without sorting."""
+
+    def __init__(self, board: SudokuBoard):
+        """
+        Computes the candidates of the empty squares of a board.
+        @param board: The board
+        """
+        N = board.N
+        self.N = N
+        self.peers = square_peers(board.m, board.n)
+        self.masks = [0] * (N * N)
+        # buckets[c] has bit k set for every empty square k = i * N + j with c candidates
+        self.buckets = [0] * (N + 1)
+        for i in range(N):
+            for j in range(N):
+                if board.get(i, j) == SudokuBoard.empty:
+                    k = i * N + j
+                    mask = board.candidates(i, j)
+                    self.masks[k] = mask
+                    self.buckets[popcount(mask)] |= 1 << k
+        # For every move that was played, the square, its candidates and the peers that lost a candidate
+        self.undo_stack = []
+
+    def play(self, i: int, j: int, value: int):
+        """
+        Fills in a square, and removes the value from the candidates of its peers.
+        @param i: The row of the square
+        @param j: The column of the square
+        @param value: The value that is filled in
+        @return: The indices of the peers that lost a candidate
+        """
+        k = i * self.N + j
+        masks = self.masks
+        buckets = self.buckets
+        mask = masks[k]
+        buckets[popcount(mask)] ^= 1 << k
+        masks[k] = 0
+        bit = 1 << (value - 1)
+        changed = []
+        for p in self.peers[k]:
+            peer_mask = masks[p]
+            if peer_mask & bit:
+                count = popcount(peer_mask)
+                square = 1 << p
+                buckets[count] ^= square
+                buckets[count - 1] ^= square
+                masks[p] = peer_mask & ~bit
+                changed.append(p)
+        self.undo_stack.append((k, mask, bit, changed))
+        return changed
+
+    def unplay(self) -> None:
+        """
+        Takes back the last move that was played with play.
+        """
+        k, mask, bit, changed = self.undo_stack.pop()
+        masks = self.masks
+        buckets = self.buckets
+        for p in changed:
+            peer_mask = masks[p]
+            count = popcount(peer_mask)
+            square = 1 << p
+            buckets[count] ^= square
+            buckets[count + 1] ^= square
+            masks[p] = peer_mask | bit
+        masks[k] = mask
+        buckets[popcount(mask)] ^= 1 << k
+
+    def candidates(self, i: int, j: int) -> int:
+        """
+        @param i: The row of a square
+        @param j: The column of a square
+        @return: The bitmask of the candidate values of the square, 0 if it is filled in
+        """
+        return self.masks[i * self.N + j]
+
+    def singles(self):
+        """
+        Finds the empty squares with a single candidate value, the naked singles.
+        @return: The moves that fill in these squares with their only candidate, in row-major order
+        """
+        N = self.N
+        return [Move(k // N, k % N, mask.bit_length()) for k, mask in self.bucket_squares(self.buckets[1])]
+
+    def fewest_candidates(self):
+        """
+        Lists the empty squares in order of their number of candidates, squares with the same number in row-major order.
+        @return: A generator of tuples (k, mask) with the index k = i * N + j of a square and its candidates
+        """
+        for bucket in self.buckets:
+            yield from self.bucket_squares(bucket)
+
+    def bucket_squares(self, bucket: int):
+        """
+        @param bucket: One of the buckets
+        @return: A generator of tuples (k, mask) with the index k = i * N + j and the candidates of the squares of the
+            bucket, in row-major order
+        """
+        masks = self.masks
+        while bucket:
+            square = bucket & -bucket
+            bucket ^= square
+            k = square.bit_length() - 1
+            yield k, masks[k]
@@ -1,8 +1,7 @@
+import itertools
 import math
 
-from copy import deepcopy
-
-from competitive_sudoku.sudoku import GameState, Move, SudokuBoard, TabooMove
+from competitive_sudoku.sudoku import Move, SudokuBoard, mask_values
 
 def completes_square(board, i, j):
     """
@@ -12,15 +11,7 @@ def completes_square(board, i, j):
     @param j: The column position of the to check entry
     @return: Whether the square the entry is in is now completed
     """
-    rows = board.m
-    columns = board.n
-    introw = math.ceil((i + 1) / rows)
-    intcol = math.ceil((j + 1) / columns)
-    for p in range(((introw  - 1) * rows), (introw  * rows)):
-        for q in range(((intcol - 1) * columns), (intcol * columns)):
-            if board.get(p, q) is SudokuBoard.empty:
-                return False
-    return True
+    return board.block_empty[board.block_index(i, j)] == 0
 
 def completes_col(board, N, j):
     """
@@ -30,10 +21,7 @@ def completes_col(board, N, j):
     @param j: The column position of the to check entry
     @return: Whether the column the entry is in is now completed
     """
-    for p in range(N):
-        if board.get(p, j) is SudokuBoard.empty:
-            return False
-    return True
+    return board.column_empty[j] == 0
 
 def completes_row(board, N, i):
     """
@@ -43,10 +31,7 @@ def completes_row(board, N, i):
     @param i: The row position of the to check entry
     @return: Whether the row the entry is in is now completed
     """
-    for q in range(N):
-        if board.get(i, q) is SudokuBoard.empty:
-            return False
-    return True
+    return board.row_empty[i] == 0
 
 def move_score(board: SudokuBoard, move: Move):
     """
@@ -55,14 +40,30 @@ def move_score(board: SudokuBoard, move: Move):
     @param move: the latest move
     @return: the score that a move gives
     """
-    i, j = move.i, move.j
-    N = board.N
-    completes = [completes_square(board, i, j), completes_col(board, N, j), completes_row(board, N, i)]
-
-    move_score = completes.count(True)
     scores = [0,1,3,7]
 
-    return scores[move_score]
+    return scores[board.completed_regions(move.i, move.j)]
+
+def scoring_moves(game_state):
+    """
+    Finds the moves that complete at least one region, i.e. the moves on the last empty square of a row, column or
+    block. They are found from the numbers of empty squares of the regions, without looking at the other squares.
+    @param game_state: The current state of the game
+    @return: List with the scoring moves that do not break the rules and are not taboo, in row-major order
+    """
+    board = game_state.board
+    N, m, n = board.N, board.m, board.n
+    empty = SudokuBoard.empty
+    squares = set()
+    for r in range(N):
+        if board.row_empty[r] == 1:
+            squares.add(next((r, q) for q in range(N) if board.get(r, q) == empty))
+        if board.column_empty[r] == 1:
+            squares.add(next((p, r) for p in range(N) if board.get(p, r) == empty))
+        if board.block_empty[r] == 1:
+            top, left = (r // m) * m, (r % m) * n
+            squares.add(next((p, q) for p in range(top, top + m) for q in range(left, left + n) if board.get(p, q) == empty))
+    return [Move(i, j, value) for i, j in sorted(squares) for value in mask_values(game_state.candidates(i, j))]
 
 def leaves_row(board, N, i) -> int:
     """
@@ -72,11 +73,7 @@ def leaves_row(board, N, i) -> int:
     @param i: The row in which to check
     @return: The number of empty squares in row i
     """
-    count = 0
-    for q in range(N):
-        if board.get(i, q) is SudokuBoard.empty:
-            count = count + 1
-    return count
+    return board.row_empty[i]
 
 def leaves_col(board, N, j) -> int:
     """
@@ -86,11 +83,7 @@ def leaves_col(board, N, j) -> int:
     @param j: The column in which to check
     @return: The number of empty squares in the column j
     """
-    count = 0
-    for p in range(N):
-        if board.get(p, j) is SudokuBoard.empty:
-            count = count + 1
-    return count
+    return board.column_empty[j]
 
 def leaves_square(board, i, j) -> int:
     """
@@ -100,16 +93,7 @@ def leaves_square(board, i, j) -> int:
     @param j: The column position to check for
     @return: The number of empty squares in the section in which entry (i, j) is located
     """
-    count = 0
-    rows = board.m
-    columns = board.n
-    introw = math.ceil((i + 1) / rows)
-    intcol = math.ceil((j + 1) / columns)
-    for p in range(((introw - 1) * rows), (introw * rows)):
-        for q in range(((intcol - 1) * columns), (intcol * columns)):
-            if board.get(p, q) is SudokuBoard.empty:
-                count = count + 1
-    return count
+    return board.block_empty[board.block_index(i, j)]
 
 def retrieve_board_status(board: SudokuBoard, move: Move):
     """
@@ -127,6 +111,11 @@ def retrieve_board_status(board: SudokuBoard, move: Move):
     scores = [0, 1, 3, 7]
     obtainable_points = 0
 
+    def fill_score(p, q):
+        # Filling in the empty entry (p, q) completes every region in which it is the last empty entry
+        completes = [board.block_empty[board.block_index(p, q)] == 1, board.column_empty[q] == 1, board.row_empty[p] == 1]
+        return scores[completes.count(True)]
+
     if empties[0] == 1:
         # Check the remaining empty in the same square
         # Check what filling in the last empty would do i.e. count the empties of that row, square and col
@@ -137,30 +126,21 @@ def retrieve_board_status(board: SudokuBoard, move: Move):
         for p in range(((introw - 1) * rows), (introw * rows)):
             for q in range(((intcol - 1) * columns), (intcol * columns)):
                 if board.get(p, q) is SudokuBoard.empty:
-                    temp_board = deepcopy(board)
-                    temp_board.put(p, q, 1)
-                    square_completes = [completes_square(temp_board, p, q), completes_col(temp_board, N, q), completes_row(temp_board, N, p)]
-                    obtainable_points = max(obtainable_points, scores[square_completes.count(True)])
+                    obtainable_points = max(obtainable_points, fill_score(p, q))
 
     if empties[1] == 1:
         # Check the remaining empty in the same column
         # Check what filling in the last empty would do i.e. count the empties of that row, square and col
         for p in range(N):
             if board.get(p, j) is SudokuBoard.empty:
-                temp_board = deepcopy(board)
-                temp_board.put(p, j, 1)
-                col_completes = [completes_square(temp_board, p, j), completes_col(temp_board, N, j), completes_row(temp_board, N, p)]
-                obtainable_points = max(obtainable_points, scores[col_completes.count(True)])
+                obtainable_points = max(obtainable_points, fill_score(p, j))
 
     if empties[2] == 1:
         # Check the remaining empty on the same row
         # Check what filling in the last empty would do i.e. count the empties of that row, square and col
         for q in range(N):
             if board.get(i, q) is SudokuBoard.empty:
-                temp_board = deepcopy(board)
-                temp_board.put(i, q, 1)
-                row_completes = [completes_square(temp_board, i, q), completes_col(temp_board, N, q), completes_row(temp_board, N, i)]
-                obtainable_points = max(obtainable_points, scores[row_completes.count(True)])
+                obtainable_points = max(obtainable_points, fill_score(i, q))
 
     return empties, obtainable_points
 
@@ -184,14 +164,18 @@ def diff_score(scores) -> int:
     """
     return scores[0] - scores[1]
 
-def single_possibility_sudoku_rule(game_state):
+def single_possibility_sudoku_rule(game_state, cache=None):
     """
     Implements the single possibility sudoku rule as stated on https://www.sudokudragon.com/sudokustrategy.htm .
     More specifically, finds a subset of legal moves that are the only moves that can be proposed for a certain cell
     and will therefore not be rejected.
     @param game_state: The current state of the game
+    @param cache: A CandidateCache of the board of game_state, or None to compute the candidates from the board
     @return: List with moves that are the only options for the cells of the moves
     """
+    if cache is not None:
+        return cache.singles()
+
     N = game_state.board.N
     rows = game_state.board.m
     columns = game_state.board.n
@@ -208,6 +192,20 @@ def single_possibility_sudoku_rule(game_state):
 
     return all_moves
 
+def fewest_candidates_moves(game_state, cache, limit):
+    """
+    Finds the moves of the empty squares with the fewest possible values, directly from the candidate masks of a cache.
+    The squares are taken in the order of all_possibilities.
+    @param game_state: The current state of the game
+    @param cache: A CandidateCache of the board of game_state
+    @param limit: The maximum number of squares of which the moves are returned
+    @return: List with the moves of at most limit squares that do not break the rules and are not taboo
+    """
+    N = cache.N
+    taboo_masks = game_state.taboo_masks
+    return [Move(k // N, k % N, value) for k, mask in itertools.islice(cache.fewest_candidates(), limit)
+            for value in mask_values(mask & ~taboo_masks[k])]
+
 def all_possibilities(game_state):
     """
     Finds all possibilities for every empty square and sorts a dictionary with squares and number of possible values,
@@ -246,15 +244,9 @@ def possible_moves(game_state, N, i, j, rows, columns):
     @param columns: The number of columns per region
     @return: The number of possible values for some row and column position
     """
-    # Retrieve the sets of values that can be filled in in every region
-    block = check_possible_values_block(game_state, N, i, j, rows, columns)
-    row = check_possible_values_row(game_state, N, i, j)
-    column = check_possible_values_column(game_state, N, i, j)
-
-    # Take their intersection
-    possible_values = block.intersection(row, column)
-
-    return possible_values
+    # The board keeps track of the values used in every region, so the intersection of the values that can still be
+    # filled in is available directly
+    return set(mask_values(game_state.board.candidates(i, j)))
 
 def check_possible_values_block(game_state, N, i, j, rows, columns) -> set:
     """
@@ -265,22 +257,8 @@ def check_possible_values_block(game_state, N, i, j, rows, columns) -> set:
     @param j: Column of the given cell
     @return: Set of values still to be filled in in the block
     """
-    lst = list(range(1, N+1))
-    possible_values = set(lst)
-
-    # Convert row and column to the correct square on the board
-    introw = math.ceil((i + 1) / rows)
-    intcol = math.ceil((j + 1) / columns)
-
-    # Find the values already present in the block
-    present_values = set([])
-    for s in range(((introw - 1) * rows), (introw * rows)):
-        for t in range(((intcol - 1) * columns), (intcol * columns)):
-            if game_state.board.get(s, t) != SudokuBoard.empty:
-                present_values.add(game_state.board.get(s, t))
-
-    # Return those values that are yet to be filled in in the block
-    return possible_values.difference(present_values)
+    board = game_state.board
+    return set(mask_values(board.full_mask & ~board.block_masks[board.block_index(i, j)]))
 
 
 def check_possible_values_row(game_state, N, i, j) -> set:
@@ -292,17 +270,8 @@ def check_possible_values_row(game_state, N, i, j) -> set:
     @param j: Column of the given cell
     @return: Set of values still to be filled in in the block
     """
-    lst = list(range(1, N+1))
-    possible_values = set(lst)
-
-    # Find the values already present in the row
-    present_values = set([])
-    for p in range(N):
-        if game_state.board.get(i, p) != SudokuBoard.empty:
-            present_values.add(game_state.board.get(i, p))
-
-    # Return those values that are yet to be filled in in the block
-    return possible_values.difference(present_values)
+    board = game_state.board
+    return set(mask_values(board.full_mask & ~board.row_masks[i]))
 
 
 def check_possible_values_column(game_state, N, i, j) -> set:
@@ -314,17 +283,8 @@ def check_possible_values_column(game_state, N, i, j) -> set:
     @param j: Column of the given cell
     @return: Set of values still to be filled in in the block
     """
-    lst = list(range(1, N+1))
-    possible_values = set(lst)
-
-    # Find the values already present in the row
-    present_values = set([])
-    for q in range(N):
-        if game_state.board.get(q, j) != SudokuBoard.empty:
-            present_values.add(game_state.board.get(q, j))
-
-    # Return those values that are yet to be filled in in the block
-    return possible_values.difference(present_values)
+    board = game_state.board
+    return set(mask_values(board.full_mask & ~board.column_masks[j]))
 
 def compute_total_number_empty_cells(game_state):
     """
@@ -332,11 +292,4 @@ def compute_total_number_empty_cells(game_state):
     @param game_state: The current state of the game
     @return: The number of empty cells on the board
     """
-    count = 0
-    for m in range(game_state.board.N):
-        for n in range(game_state.board.N):
-            if game_state.board.get(m, n) == SudokuBoard.empty:
-                count += 1
-
-    return count
-
+    return game_state.board.empty_count
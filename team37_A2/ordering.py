@@ -0,0 +1,72 @@
+from competitive_sudoku.sudoku import GameState, Move, SudokuBoard
+
+
+def immediate_score(board: SudokuBoard, move: Move) -> int:
+    """
+    Compute the reward of a move before it is played, from the number of empty squares of its regions.
+    @param board: The current board
+    @param move: A move on an empty square
+    @return: The reward of the move
+    """
+    i, j = move.i, move.j
+    completed = (board.row_empty[i] == 1) + (board.column_empty[j] == 1) + (board.block_empty[board.block_index(i, j)] == 1)
+    return GameState.region_scores[completed]
+
+
+class MoveOrdering(object):
+    """A MoveOrdering sorts the moves of a position such that the moves that are most likely to cause a cutoff are
+    searched first: the move of the transposition table, then the scoring moves, then the killer moves of the ply, and
+    then the moves with the best history. Moves that are equal in all of these keep their order, so the ordering is
+    deterministic."""
+
+    def __init__(self, killers_per_ply: int = 2):
+        """
+        @param killers_per_ply: The number of killer moves that are kept for every ply
+        """
+        self.killers_per_ply = killers_per_ply
+        # killers[ply] is a list of the last moves that caused a cutoff at that ply, the most recent first
+        self.killers = {}
+        # history[(i, j, value)] is the total weight of the cutoffs caused by the move anywhere in the tree
+        self.history = {}
+
+    def new_search(self) -> None:
+        """
+        Prepare for the search of a new move. The killer moves are cleared, since the plies have shifted, and the
+        history is aged, such that recent cutoffs weigh more.
+        """
+        self.killers.clear()
+        self.history = {key: weight // 2 for key, weight in self.history.items() if weight > 1}
+
+    def order(self, board: SudokuBoard, moves, tt_move, ply: int):
+        """
+        Sort the moves of a position.
+        @param board: The current board
+        @param moves: The moves of the position
+        @param tt_move: The best move of an earlier search of the position, or None
+        @param ply: The distance of the position to the root of the search
+        @return: A new list with the moves in the order in which they should be searched
+        """
+        killers = self.killers.get(ply, ())
+        history = self.history
+
+        def key(move):
+            killer_rank = killers.index(move) if move in killers else len(killers)
+            return (tt_move is None or move != tt_move, -immediate_score(board, move), killer_rank,
+                    -history.get((move.i, move.j, move.value), 0))
+
+        return sorted(moves, key=key)
+
+    def record_cutoff(self, move: Move, ply: int, depth: int) -> None:
+        """
+        Record a move that caused a cutoff.
+        @param move: The move
+        @param ply: The distance of the position to the root of the search
+        @param depth: The remaining depth of the search of the position
+        """
+        killers = self.killers.setdefault(ply, [])
+        if move in killers:
+            killers.remove(move)
+        killers.insert(0, move)
+        del killers[self.killers_per_ply:]
+        key = (move.i, move.j, move.value)
+        self.history[key] = self.history.get(key, 0) + depth * depth
@@ -0,0 +1,224 @@
+import functools
+
+from competitive_sudoku.sudoku import SudokuBoard, zobrist_keys
+from team37_A2.candidates import square_peers
+
+
+@functools.lru_cache(maxsize=None)
+def square_units(m: int, n: int):
+    """
+    Compute the units of a board, i.e. its rows, columns and blocks.
+    @param m: The number of rows of a block
+    @param n: The number of columns of a block
+    @return: A tuple of 3 * N tuples with the square indices k = i * N + j of every unit
+    """
+    N = m * n
+    rows = [tuple(i * N + j for j in range(N)) for i in range(N)]
+    columns = [tuple(i * N + j for i in range(N)) for j in range(N)]
+    blocks = [tuple((p + a) * N + q + b for a in range(m) for b in range(n))
+              for p in range(0, N, m) for q in range(0, N, n)]
+    return tuple(rows + columns + blocks)
+
+
+@functools.lru_cache(maxsize=None)
+def square_unit_indices(m: int, n: int):
+    """
+    Compute the units of every square.
+    @param m: The number of rows of a block
+    @param n: The number of columns of a block
+    @return: A tuple with for every square index k = i * N + j the indices in square_units(m, n) of its row, column and
+        block
+    """
+    N = m * n
+    return tuple((k // N, N + k % N, 2 * N + (k // N) // m * m + (k % N) // n) for k in range(N * N))
+
+
+class BudgetExhausted(Exception):
+    """Raised when a solvability check searched more nodes than its budget."""
+
+
+class SolvabilityChecker(object):
+    """A SolvabilityChecker decides whether a board can still be completed to a solution, such that the search can tell
+    which moves the oracle would declare taboo. It uses constraint propagation (naked and hidden singles), which starts
+    from the squares of which the candidates changed, and a depth first search over the square with the fewest
+    candidates, which is bounded by a node budget. The results are cached per board, together with the known solutions
+    that agree with the board. A board that was reached by filling in one square agrees with a solution if its parent
+    board does and the solution has the same value on that square, so it is often solvable without any search."""
+
+    def __init__(self, m: int, n: int, budget: int = 200, max_entries: int = 1 << 16, max_solutions: int = 4):
+        """
+        @param m: The number of rows of a block
+        @param n: The number of columns of a block
+        @param budget: The maximum number of search nodes of a single check
+        @param max_entries: The maximum number of boards of which the result is cached
+        @param max_solutions: The maximum number of solutions that are kept, and that are kept per board
+        """
+        self.N = m * n
+        self.full_mask = (1 << self.N) - 1
+        self.peers = square_peers(m, n)
+        self.units = square_units(m, n)
+        self.square_units = square_unit_indices(m, n)
+        self.square_keys = zobrist_keys(self.N)[0]
+        self.budget = budget
+        self.max_entries = max_entries
+        self.max_solutions = max_solutions
+        # results[zobrist] is a list [result, solutions, searched] with the result of a board, the known solutions that
+        # agree with it, and whether the result was searched or only propagated
+        self.results = {}
+        self.solutions = []
+        self.nodes = 0
+        self.limit = budget
+
+    def is_solvable(self, board: SudokuBoard, masks, k: int = None, changed=None, search: bool = True) -> bool:
+        """
+        Check whether a board can be completed to a solution.
+        @param board: The board
+        @param masks: The candidate masks of the squares of the board, e.g. the masks of a CandidateCache
+        @param k: The index of the square that was filled in last, or None if the board is checked as a whole
+        @param changed: The indices of the squares of which the candidates changed when square k was filled in
+        @param search: If False, only constraint propagation is used, which may leave the result undecided
+        @return: True if the board has a solution, False if it has none, or None if the budget was exhausted
+        """
+        key = board.zobrist
+        entry = self.results.get(key)
+        if entry is not None and (entry[2] or not search):
+            return entry[0]
+        squares = board.squares
+        parent = None
+        if k is not None:
+            value = squares[k]
+            parent = self.results.get(key ^ self.square_keys[self.N * k + value - 1])
+        if parent is not None:
+            solutions = [solution for solution in parent[1] if solution[k] == value]
+        else:
+            solutions = [solution for solution in self.solutions
+                         if all(value == SudokuBoard.empty or value == solution[j] for j, value in enumerate(squares))]
+        if solutions:
+            result = True
+        else:
+            self.nodes = 0
+            self.limit = self.budget if search else 1
+            pending = list(changed) if k is not None else None
+            try:
+                solution = self.solve(list(squares), list(masks), pending)
+            except BudgetExhausted:
+                solution = None
+                result = None
+            else:
+                result = solution is not None
+            if solution is not None:
+                solutions = [solution]
+                self.solutions.insert(0, solution)
+                del self.solutions[self.max_solutions:]
+                if parent is not None:
+                    # the parent board agrees with the solution as well
+                    parent[0] = True
+                    parent[1].insert(0, solution)
+                    del parent[1][self.max_solutions:]
+        if len(self.results) >= self.max_entries:
+            self.results.clear()
+        self.results[key] = [result, solutions, search or result is not None]
+        return result
+
+    def assign(self, values, masks, k: int, value: int, pending) -> None:
+        """
+        Fill in a square, and remove the value from the candidates of its peers.
+        @param pending: A list to which the peers that lost a candidate are appended
+        """
+        values[k] = value
+        masks[k] = 0
+        bit = 1 << (value - 1)
+        for p in self.peers[k]:
+            if masks[p] & bit:
+                masks[p] ^= bit
+                pending.append(p)
+
+    def propagate(self, values, masks, pending) -> bool:
+        """
+        Fill in the naked singles (squares with one candidate) and hidden singles (values with one possible square in a
+        unit) until none are left. Only the pending squares and the units that contain them are examined, and the
+        squares of which the candidates change along the way.
+        @param pending: The indices of the squares of which the candidates changed, it is emptied
+        @return: False if a contradiction was found
+        """
+        full_mask = self.full_mask
+        units = self.units
+        square_units = self.square_units
+        while pending:
+            dirty = set()
+            while pending:
+                k = pending.pop()
+                if values[k] != SudokuBoard.empty:
+                    continue
+                mask = masks[k]
+                if mask == 0:
+                    return False
+                if mask & (mask - 1) == 0:
+                    self.assign(values, masks, k, mask.bit_length(), pending)
+                dirty.update(square_units[k])
+            for u in dirty:
+                unit = units[u]
+                once = 0
+                twice = 0
+                used = 0
+                for k in unit:
+                    value = values[k]
+                    if value == SudokuBoard.empty:
+                        mask = masks[k]
+                        twice |= once & mask
+                        once |= mask
+                    else:
+                        used |= 1 << (value - 1)
+                needed = full_mask & ~used
+                if once & needed != needed:
+                    # a value that is missing in the unit cannot be placed anywhere
+                    return False
+                hidden = once & ~twice & needed
+                while hidden:
+                    bit = hidden & -hidden
+                    hidden ^= bit
+                    for k in unit:
+                        if masks[k] & bit:
+                            self.assign(values, masks, k, bit.bit_length(), pending)
+                            break
+                    else:
+                        # the square of the value was taken by another hidden single
+                        return False
+        return True
+
+    def solve(self, values, masks, pending=None):
+        """
+        Search a solution of a partially filled board.
+        @param values: The values of the squares, they are modified
+        @param masks: The candidate masks of the squares, they are modified
+        @param pending: The indices of the squares of which the candidates changed, or None to propagate from all squares
+        @return: The values of the squares of a solution, or None if there is no solution
+        """
+        self.nodes += 1
+        if self.nodes > self.limit:
+            raise BudgetExhausted()
+        if pending is None:
+            pending = [k for k, value in enumerate(values) if value == SudokuBoard.empty]
+        if not self.propagate(values, masks, pending):
+            return None
+        best = None
+        best_count = self.N + 1
+        for k, value in enumerate(values):
+            if value == SudokuBoard.empty:
+                count = bin(masks[k]).count('1')
+                if count < best_count:
+                    best, best_count = k, count
+                    if count == 2:
+                        break
+        if best is None:
+            return values
+        mask = masks[best]
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            child_values, child_masks, child_pending = list(values), list(masks), []
+            self.assign(child_values, child_masks, best, bit.bit_length(), child_pending)
+            solution = self.solve(child_values, child_masks, child_pending)
+            if solution is not None:
+                return solution
+        return None
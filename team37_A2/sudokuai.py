@@ -2,25 +2,77 @@
 #  Software License, (See accompanying file LICENSE or copy at
 #  https://www.gnu.org/licenses/gpl-3.0.txt)
 
-import random
 import time
 import math
-from copy import deepcopy
-import itertools
 
-from competitive_sudoku.sudoku import GameState, Move, SudokuBoard, TabooMove
+from competitive_sudoku.sudoku import GameState, Move, SudokuBoard, TabooMove, mask_values
 import competitive_sudoku.sudokuai
-from team37_A2.heuristics import move_score, diff_score, prepares_sections, \
-                                 single_possibility_sudoku_rule, all_possibilities, retrieve_board_status, \
-                                    compute_total_number_empty_cells
+from team37_A2.heuristics import move_score, diff_score, \
+                                 single_possibility_sudoku_rule, fewest_candidates_moves, retrieve_board_status, \
+                                    compute_total_number_empty_cells, scoring_moves
 from team37_A2.metadata import Metadata
+from team37_A2.transposition import TranspositionTable, EXACT, LOWER, UPPER
+from team37_A2.timemanager import TimeManager
+from team37_A2.candidates import CandidateCache
+from team37_A2.solvability import SolvabilityChecker
+from team37_A2.ordering import MoveOrdering, immediate_score
+
+ALPHABETA = 'alphabeta'  # Minimax search with alpha-beta pruning, see SudokuAI.alphabeta
+PVS = 'pvs'  # Negamax principal variation search with aspiration windows, see SudokuAI.pvs
+
+
+class EndgameTimeout(Exception):
+    """Raised when the endgame solver runs out of its share of the time of a move."""
+
 
 class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
     """
     Sudoku AI that computes a move for a given sudoku configuration.
     """
-    def __init__(self):
+    def __init__(self, search: str = ALPHABETA, max_depth: int = None, aspiration_window: int = 3,
+                 quiescence_limit: int = 64, endgame_threshold: int = 10, endgame_entries: int = 1 << 18):
+        """
+        @param search: The search algorithm, ALPHABETA or PVS
+        @param max_depth: The maximum depth of the iterative deepening, or None to search until the deadline
+        @param aspiration_window: The distance of the bounds of the aspiration window to the value of the previous
+            iteration, see aspiration_search
+        @param quiescence_limit: The maximum number of nodes of the quiescence search of a position at the horizon, or 0
+            to evaluate these positions without a quiescence search
+        @param endgame_threshold: The number of empty squares at or below which the game is solved exactly, see
+            solve_endgame
+        @param endgame_entries: The maximum number of positions of which the endgame solver keeps the value
+        """
         super().__init__()
+        if search not in (ALPHABETA, PVS):
+            raise ValueError(f'unknown search algorithm {search!r}')
+        self.search = search
+        self.max_depth = max_depth
+        self.aspiration_window = aspiration_window
+        self.quiescence_limit = quiescence_limit
+        # The number of nodes of the current quiescence search, see quiescence
+        self.quiescence_nodes = 0
+        self.endgame_threshold = endgame_threshold
+        self.endgame_entries = endgame_entries
+        # endgame_table[hash] is a tuple (value, best_move) of a position that was solved exactly, of which the value is
+        # relative to the score difference of the position, like in the transposition table
+        self.endgame_table = {}
+        # The time.monotonic() value at which the endgame solver gives up
+        self.endgame_stop = math.inf
+        # Results of earlier searches, shared between the iterations of the iterative deepening
+        self.transposition_table = TranspositionTable()
+        # Search statistics of the current move, see report_search
+        self.nodes = 0
+        self.tt_probes_start = 0
+        self.tt_hits_start = 0
+        # The number of moves played at the root of the search, and the best root move of the last completed iteration
+        self.root_ply = 0
+        self.root_best = None
+        # The candidate values of the empty squares of the board that is searched, see play and unplay
+        self.candidate_cache = None
+        # Decides which moves the oracle would declare taboo, its results are kept across moves
+        self.solvability = None
+        # Killer moves and history of the cutoffs, which decide the order in which the moves are searched
+        self.move_ordering = MoveOrdering()
 
     def check_square(self, game_state, i, j, value):
         """
@@ -31,18 +83,8 @@ class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
         @param value: The value to be entered in the moves position (i, j)
         @return: Whether the value already occurs in the square in which the move occurs
         """
-        rows = game_state.board.m
-        columns = game_state.board.n
- 
-        # convert row and column to the correct square on the board               
-        introw = math.ceil((i + 1) / rows)
-        intcol = math.ceil((j + 1) / columns)
-        
-        for p in range(((introw - 1) * rows), (introw * rows)):
-            for q in range(((intcol - 1) * columns), (intcol * columns)):
-                if game_state.board.get(p, q) == value:
-                    return False
-        return True
+        board = game_state.board
+        return not board.block_masks[board.block_index(i, j)] & (1 << (value - 1))
 
     def check_column(self, game_state, N, j, value):
         """
@@ -53,10 +95,7 @@ class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
         @param value: The value to be entered in the column
         @return: Whether the value already occurs in the column
         """
-        for p in range(N):
-            if game_state.board.get(p, j) == value:
-                return False
-        return True
+        return not game_state.board.column_masks[j] & (1 << (value - 1))
 
     def check_row(self, game_state, N, i, value):
         """
@@ -67,10 +106,7 @@ class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
         @param value: The value to be entered in the row
         @return: Whether the value already occurs in the row
         """
-        for q in range(N):
-            if game_state.board.get(i, q) == value:
-                return False
-        return True
+        return not game_state.board.row_masks[i] & (1 << (value - 1))
 
     def possible_move(self, game_state, i, j, value):
         """
@@ -86,14 +122,9 @@ class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
         @param value: The value which the agent wishes to insert
         @return: Boolean indicating whether the move is possible (=True) or not (=False)
         """
-        N = game_state.board.N
-        # Return whether the move violates any of the games rules
-        if not (self.check_column(game_state, N, j, value) == self.check_row(game_state, N, i, value) ==
-                self.check_square(game_state, i, j, value) == True):
-            return False
-        else:
-            return game_state.board.get(i, j) == SudokuBoard.empty and not TabooMove(i, j,
-                                                                                     value) in game_state.taboo_moves
+        # The candidates of a square are empty if the square is non-empty, and exclude any taboo value or value that
+        # violates the rules of the game in the row, column or section of the square
+        return game_state.candidates(i, j) & (1 << (value - 1)) != 0
 
     def get_all_moves(self, game_state: GameState):
         """
@@ -103,47 +134,11 @@ class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
         """
         N = game_state.board.N
 
-        rows = game_state.board.m
-        columns = game_state.board.n
-
-        # Selects only those moves which do not violate the rules
-        all_moves = [Move(i, j, value) for i in range(N) for j in range(N) for value in range(1, N+1) if
-                     self.possible_move(game_state, i, j, value)]
+        # Selects only those moves which do not violate the rules, using the candidate values of every square
+        all_moves = [Move(i, j, value) for i in range(N) for j in range(N) for value in mask_values(game_state.candidates(i, j))]
 
         return all_moves
 
-    def update_taboo_moves(self, game_state:GameState):
-        """
-        Updates the list of taboo moves.
-        @param game_state: The current state of the game
-        @return: A list with the taboo moves
-        """
-        taboo_moves = []
-        if len(game_state.moves) > 0:
-            last_move = game_state.moves[-1]
-            i = last_move.i
-            j = last_move.j
-            value = last_move.value
-            N = game_state.board.N
-            rows = game_state.board.m
-            columns = game_state.board.n
-
-            for _j in range(N):
-                taboo_move = Move(i, _j, value)
-                if not self.possible_move(game_state, i, _j, value):
-                    taboo_moves.append(taboo_move)
-            for _i in range(N):
-                taboo_move = Move(_i, j, value)
-                if not self.possible_move(game_state, _i, j, value):
-                    taboo_moves.append(taboo_move)
-
-        # Concatenate with the list of moves that were established to be taboo before
-        if game_state.taboo_moves:
-            taboo_moves = game_state.taboo_moves + taboo_moves
-        else:
-            taboo_moves = taboo_moves
-        return taboo_moves
-
     @staticmethod
     def check_random_move(game_state: GameState, all_moves: [Move]):
         """
@@ -154,9 +149,8 @@ class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
         """
         depth_1_scores = []
         for move in all_moves:
-            new_gs = deepcopy(game_state)
-            new_gs.board.put(move.i, move.j, move.value)
-            depth_1_scores.append(move_score(new_gs.board, move))
+            depth_1_scores.append(game_state.apply(move))
+            game_state.undo()
         return depth_1_scores
 
     def compute_best_move(self, game_state: GameState) -> None:
@@ -167,17 +161,41 @@ class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
         @return:
         """
         curr_player = 1 if len(game_state.moves) % 2 == 0 else 2
-        # Initiate a random valid move, so some move is always returned.
+        self.nodes = 0
+        self.tt_probes_start = self.transposition_table.probes
+        self.tt_hits_start = self.transposition_table.hits
+        timer = TimeManager(self.remaining_time())
+        self.move_ordering.new_search()
+        # Initiate a valid move, so some move is always returned.
         # This is needed in case our minimax does not finish at least one evaluation to ensure we do not hit a "no move selected"
         #    as this would instantly lose us the game.
         all_moves = self.get_all_moves(game_state)
-        proposal = random.choice(all_moves)
+        proposal = self.move_ordering.order(game_state.board, all_moves, None, 0)[0]
         # Propose the fallback move
         self.propose_move(proposal)
+        self.root_ply = len(game_state.moves)
+        self.candidate_cache = CandidateCache(game_state.board)
+        board = game_state.board
+        if self.solvability is None or self.solvability.N != board.N:
+            self.solvability = SolvabilityChecker(board.m, board.n)
+        self.root_best = proposal
 
         # Introducing a null move to allow for initial call
         nullMove = Move(-1, -1, -1)
 
+        # With few empty squares left, the rest of the game is solved exactly. The solver gets half of the time, if it
+        # does not finish the iterative deepening below takes over, and still profits from the positions it solved.
+        if board.empty_count <= self.endgame_threshold:
+            self.endgame_stop = time.monotonic() + timer.remaining() / 2
+            try:
+                best_move, value = self.solve_endgame(game_state)
+            except EndgameTimeout:
+                pass
+            else:
+                self.report_statistics(board.empty_count)
+                self.propose_final_move(best_move)
+                return
+
         """
         Initiate a Metadata object to be sent with the original alphabeta() function call, consisting of:
         - last_move: a null move as initiated above
@@ -188,15 +206,29 @@ class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
 
         # Set the initial starting depth
         depth = 1
+        # The value of the last completed iteration, around which the PVS search puts its aspiration window
+        value = None
         """
-        As the time per turn is undefined and we will be interrupted in a way that our last proposed move is used,
-        we can incrementally increase the depth at which our alphabeta tree is evaluating game states.
-        We do this through a never ending while loop which first computes the best move at some depth, proposes this move
-        and then increments the depth by 1.
+        As we will be interrupted in a way that our last proposed move is used, we can incrementally increase the depth
+        at which our alphabeta tree is evaluating game states.
+        We do this through a loop which first computes the best move at some depth, proposes this move and then
+        increments the depth by 1. The loop stops when the time manager expects that the next iteration cannot be
+        completed before the deadline, or when the search reaches the end of the game.
         """
         while True:
-            best_move, best_score, meta = self.alphabeta(game_state, meta, True, depth, -math.inf, math.inf, curr_player)
+            iteration_start = self.nodes
+            if self.search == PVS:
+                best_move, value, meta = self.aspiration_search(game_state, meta, depth, value)
+            else:
+                best_move, value, meta = self.alphabeta(game_state, meta, True, depth, -math.inf, math.inf, curr_player)
             self.propose_move(best_move)
+            self.root_best = best_move
+            self.report_statistics(depth)
+            timer.finish_iteration(self.nodes - iteration_start)
+            # A deeper search cannot see more moves than there are empty squares
+            if depth >= game_state.board.empty_count or depth == self.max_depth or \
+                    not timer.can_complete_next_iteration(self.nodes):
+                break
             depth = depth + 1
 
     def hasEmpty(self, board: SudokuBoard) -> bool:
@@ -205,11 +237,32 @@ class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
         @param board: The board to check for empty spaces
         @return: Whether there is at least one empty space on the input board.
         """
-        for i in range(board.N):
-            for j in range(board.N):
-                if board.get(i, j) is SudokuBoard.empty:
-                    return True
-        return False
+        return board.empty_count > 0
+
+    def generate_moves(self, game_state: GameState):
+        """
+        Generate the moves that are searched in a position.
+        @param game_state: The current game state
+        @return: A list of moves that do not break the rules and are not taboo
+        """
+        N = game_state.board.N
+        taboo_masks = game_state.taboo_masks
+
+        # Get a list of moves that are certainly right
+        all_moves = single_possibility_sudoku_rule(game_state, self.candidate_cache)
+
+        # Calculate the number of empty cells on the board
+        empty_q = compute_total_number_empty_cells(game_state)
+
+        # If there are less half of the empty cells of which we know what value must be filled in
+        if len(all_moves) < int(empty_q/2):
+            # Enter the Early Game and execute alternative all_moves selection
+            # Retrieve the moves for the x cells where we can be most certain that the proposed values are right
+            # Look at the first x cells (ratio of NxM)
+            return fewest_candidates_moves(game_state, self.candidate_cache, int(N**2/2))
+
+        # Filter out any taboo moves, the candidates of the cache already follow the rules
+        return [move for move in all_moves if not taboo_masks[move.i * N + move.j] & (1 << (move.value - 1))]
 
     def alphabeta(self, game_state: GameState, meta: Metadata, maximizing_player: bool, depth, alpha, beta, curr_player) -> (Move, int, Metadata):
         """
@@ -229,68 +282,51 @@ class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
         # Default nullMove for referencing (this ensures that any call with no move is able to be compared with moves it may encounter)
         nullMove = Move(-1, -1, -1)
 
-        # Get a list of moves that are certainly right
-        all_moves = single_possibility_sudoku_rule(game_state)
-
-        # Calculate the number of empty cells on the board
-        empty_q = compute_total_number_empty_cells(game_state)
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self.report_statistics()
 
-        # If there are less half of the empty cells of which we know what value must be filled in
-        if len(all_moves) < int(empty_q/2):
-            # Enter the Early Game and execute alternative all_moves selection
-            # Retrieve the moves for the x cells where we can be most certain that the proposed values are right
-            all_options = all_possibilities(game_state)
-            all_moves = []
-            # Look at the first x cells (ratio of NxM)
-            count = 0
-            poss_threshold = int(game_state.board.N**2/2)
-            if not len(all_options) > poss_threshold:
-                poss_threshold = len(all_options)
-            for key in dict(itertools.islice(all_options.items(), poss_threshold)):
-                for value in all_options[key]:
-                    all_moves.append(Move(key[0], key[1], value))
+        position_key = game_state.position_hash()
+        base = self.score_difference(game_state, curr_player)
+        alpha_orig, beta_orig = alpha, beta
+        tt_move, value, alpha, beta = self.probe_result(position_key, depth, alpha, beta, base)
+        if value is not None:
+            return tt_move, value, meta
 
-        # Filter out any rule-breaking or taboo moves
-        all_moves = [move for move in all_moves if self.possible_move(game_state, move.i, move.j, move.value)]
+        all_moves = self.generate_moves(game_state)
 
         # Check whether we reached a leaf node or the maximum depth we intend to search on
         if depth == 0 or len(all_moves) == 0:
-            # Check if the game finished
+            # Check if the game finished, or whether we've hit a deadlock
+            # We avoid this deadlock path by checking for nullMoves in choosing best moves
             if len(all_moves) == 0:
-                if not self.hasEmpty(game_state.board):
-                    # The game has finished so we return the final score of the board
-                    return nullMove, diff_score(game_state.scores), meta
-                else:
-                    # We cannot perform any more moves but the game is not finished, we've hit a deadlock
-                    # We avoid this deadlock path by checking for nullMoves in choosing best moves
-                    return nullMove, None, meta
+                return nullMove, self.final_value(game_state, base), meta
+
+            # Evaluate the leaf node, extended with the scoring moves that are available at the horizon
+            value = self.evaluate_horizon(game_state, meta, alpha, beta, curr_player)
+            self.store_result(position_key, 0, value, nullMove, alpha_orig, beta_orig, base)
+            return nullMove, value, meta
 
-            # Evaluate the leaf node based on the heuristics function "evaluate_state"
-            return nullMove, self.evaluate_state(game_state, meta.last_move, curr_player), meta
+        ply = len(game_state.moves) - self.root_ply
+        all_moves, propose_improvements = self.order_moves(game_state, all_moves, tt_move, ply)
 
         # Not a leaf node, compute the best option among the sub-trees according to the maximizing_player parameter
         if maximizing_player:
             # Start with -infty
             best_value = -math.inf
-            # Pick a random move to ensure some move will be returned after computation
-            best_move = random.choice(all_moves)
-
-            # Compute the best sub-tree each created using one of the possible moves
-            for move in all_moves:
-                # Create a copy of the game_state (to avoid any backward passing problems)
-                new_gs = deepcopy(game_state)
-                # Update the copied game state with the information resulting from the executed move
-                new_gs.board.put(move.i, move.j, move.value)
-                new_gs.moves.append(move)
-                new_gs.taboo_moves = self.update_taboo_moves(new_gs)
-                # Update the scores in the game
-                player_number = 1 if len(game_state.moves) % 2 == 0 else 2
-                new_gs.scores[player_number-1] = new_gs.scores[player_number-1] + move_score(new_gs.board, move)
+            # Pick the first move to ensure some move will be returned after computation
+            best_move = all_moves[0]
+
+            # Compute the best sub-tree each created using one of the possible moves, which are played on the game state
+            # itself, this updates the board, the history and the scores
+            for move in self.searched_moves(game_state, all_moves):
                 # Update the metadata, note that meta.best_move and meta.best_value did not change (yet)
                 meta.setLast(move)
 
                 # Compute and compare the evaluation of further subtree's selecting the maximum of the highest found sub-tree and the current sub-tree
-                curr_value = self.alphabeta(new_gs, meta, False, depth - 1, alpha, beta, curr_player)[1]
+                curr_value = self.alphabeta(game_state, meta, False, depth - 1, alpha, beta, curr_player)[1]
+                # Restore the game state for the remaining moves
+                self.unplay(game_state)
                 # Check whether a guaranteed unsolvable board was encountered
                 if curr_value is None:
                     # Check whether it is the only option in the subtree
@@ -308,37 +344,35 @@ class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
                     # Improvement found, update best move
                     best_value = new_value
                     best_move = move
+                    if propose_improvements and move is not all_moves[0]:
+                        self.propose_move(move)
 
                 alpha = max(alpha, new_value)
 
                 if beta <= alpha:
+                    self.move_ordering.record_cutoff(move, ply, depth)
                     break
 
+            self.store_result(position_key, depth, best_value, best_move, alpha_orig, beta_orig, base)
             # Return the best move found at the root node
             return best_move, best_value, meta
         else:
             # This is the minimizing players actions
             # Start with infty
             best_value = math.inf
-            # Pick a random move to ensure some move will be returned after computation
-            best_move = random.choice(all_moves)
-
-            # Compute the best sub-tree each created using one of the possible moves
-            for move in all_moves:
-                # Create a copy of the game_state (to avoid any backward passing problems)
-                new_gs = deepcopy(game_state)
-                # Update the copied game state with the information resulting from the executed move
-                new_gs.board.put(move.i, move.j, move.value)
-                new_gs.moves.append(move)
-                new_gs.taboo_moves = self.update_taboo_moves(new_gs)
-                # Update the scores in the game
-                player_number = 1 if len(game_state.moves) % 2 == 0 else 2
-                new_gs.scores[player_number-1] = new_gs.scores[player_number-1] + move_score(new_gs.board, move)
+            # Pick the first move to ensure some move will be returned after computation
+            best_move = all_moves[0]
+
+            # Compute the best sub-tree each created using one of the possible moves, which are played on the game state
+            # itself, this updates the board, the history and the scores
+            for move in self.searched_moves(game_state, all_moves):
                 # Update the metadata, note that meta.best_move and meta.best_value did not change (yet)
                 meta.setLast(move)
 
                 # Compute and compare the evaluation of further subtree's selecting the minimum of the lowest found sub-tree and the current sub-tree
-                curr_value = self.alphabeta(new_gs, meta, True, depth - 1, alpha, beta, curr_player)[1]
+                curr_value = self.alphabeta(game_state, meta, True, depth - 1, alpha, beta, curr_player)[1]
+                # Restore the game state for the remaining moves
+                self.unplay(game_state)
                 # Check whether a guaranteed unsolvable board was encountered
                 if curr_value is None:
                     # Check whether it is the only option in the subtree
@@ -361,11 +395,381 @@ class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
                 beta = min(beta, new_value)
 
                 if beta <= alpha:
+                    self.move_ordering.record_cutoff(move, ply, depth)
                     break
 
+            self.store_result(position_key, depth, best_value, best_move, alpha_orig, beta_orig, base)
             # Return the best move found at the root node
             return best_move, best_value, meta
 
+    def aspiration_search(self, game_state: GameState, meta: Metadata, depth, previous) -> (Move, int, Metadata):
+        """
+        Search the root with a narrow window around the value of the previous iteration, which prunes more than the
+        full window if the value does not change much. If the value falls outside of the window, the search is repeated
+        with the window opened on that side.
+        @param game_state: The game state at the root of the search
+        @param meta: The metadata attached to the current routine and turn computation
+        @param depth: The depth of the search
+        @param previous: The value of the previous iteration, or None to search with the full window
+        @return: (Move, int, Metadata), see pvs
+        """
+        if previous is None:
+            return self.pvs(game_state, meta, depth, -math.inf, math.inf)
+        alpha = previous - self.aspiration_window
+        beta = previous + self.aspiration_window
+        while True:
+            best_move, value, meta = self.pvs(game_state, meta, depth, alpha, beta)
+            if value is None or alpha < value < beta:
+                return best_move, value, meta
+            # The value is only a bound, so search again with the window opened on the side where the search failed
+            if value <= alpha:
+                alpha = -math.inf
+            else:
+                beta = math.inf
+
+    def pvs(self, game_state: GameState, meta: Metadata, depth, alpha, beta) -> (Move, int, Metadata):
+        """
+        Perform a negamax principal variation search. The values are from the perspective of the player to move. The
+        first move of a node is searched with the full window, and the other moves with a null window, which only
+        proves that they are not better than the best move so far. A move that turns out to be better is searched
+        again with the full window.
+        @param game_state: The current game state to consider at the root node of the pvs() routine
+        @param meta: The metadata attached to the current routine and turn computation
+        @param depth: The maximum depth the routine is supposed to reach
+        @param alpha: The current alpha value to be considered for pruning
+        @param beta: The current beta value to be considered for pruning
+        @return: (Move, int, Metadata)
+            - Move: the best move found
+            - int: the evaluation of the best move, or None if the player to move cannot avoid a deadlock
+            - Metadata: a metadata packet from the resulting computation
+        """
+        nullMove = Move(-1, -1, -1)
+
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self.report_statistics()
+
+        player = game_state.current_player()
+        position_key = game_state.position_hash()
+        base = self.score_difference(game_state, player)
+        alpha_orig, beta_orig = alpha, beta
+        tt_move, value, alpha, beta = self.probe_result(position_key, depth, alpha, beta, base)
+        if value is not None:
+            return tt_move, value, meta
+
+        all_moves = self.generate_moves(game_state)
+
+        if len(all_moves) == 0:
+            return nullMove, self.final_value(game_state, base), meta
+        if depth == 0:
+            value = self.evaluate_horizon(game_state, meta, alpha, beta, player)
+            self.store_result(position_key, 0, value, nullMove, alpha_orig, beta_orig, base)
+            return nullMove, value, meta
+
+        ply = len(game_state.moves) - self.root_ply
+        all_moves, propose_improvements = self.order_moves(game_state, all_moves, tt_move, ply)
+
+        best_value = -math.inf
+        best_move = all_moves[0]
+        for move in self.searched_moves(game_state, all_moves):
+            meta.setLast(move)
+
+            if best_value == -math.inf:
+                value = self.pvs(game_state, meta, depth - 1, -beta, -alpha)[1]
+            else:
+                value = self.pvs(game_state, meta, depth - 1, -alpha - 1, -alpha)[1]
+                if value is not None and alpha < -value < beta:
+                    value = self.pvs(game_state, meta, depth - 1, -beta, -alpha)[1]
+            self.unplay(game_state)
+            # Skip the moves after which the opponent is deadlocked
+            if value is None:
+                continue
+            value = -value
+
+            if value > best_value:
+                # A value below alpha is only an upper bound, so it does not prove that the move is an improvement
+                if propose_improvements and move is not all_moves[0] and value > alpha:
+                    self.propose_move(move)
+                best_value = value
+                best_move = move
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                self.move_ordering.record_cutoff(move, ply, depth)
+                break
+
+        if best_value == -math.inf:
+            return best_move, None, meta
+        self.store_result(position_key, depth, best_value, best_move, alpha_orig, beta_orig, base)
+        return best_move, best_value, meta
+
+    def probe_result(self, key: int, depth: int, alpha, beta, base):
+        """
+        Look up the result of an earlier search of a position in the transposition table. The same position can be
+        reached with different scores through another move order, so the stored values are relative to the score
+        difference of the position.
+        @param key: The hash of the position
+        @param depth: The depth of the search
+        @param alpha: The current alpha value to be considered for pruning
+        @param beta: The current beta value to be considered for pruning
+        @param base: The score difference of the position, see score_difference
+        @return: (Move, int, alpha, beta)
+            - Move: the best move of the earlier search, or None
+            - int: the value of the position if the earlier search makes the search unnecessary, otherwise None
+            - alpha, beta: the window narrowed by the bound of the earlier search
+        """
+        entry = self.transposition_table.probe(key)
+        if entry is None:
+            return None, None, alpha, beta
+        entry_depth, entry_value, bound, tt_move = entry
+        if entry_depth < depth:
+            return tt_move, None, alpha, beta
+        value = entry_value + base
+        if bound == EXACT:
+            return tt_move, value, alpha, beta
+        if bound == LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        return tt_move, value if beta <= alpha else None, alpha, beta
+
+    def order_moves(self, game_state: GameState, all_moves, tt_move, ply: int):
+        """
+        Sort the moves of a position. The best move of an earlier search of the position is searched first, then the
+        scoring moves, the killer moves and the moves with the best history. At the root, the best move of the last
+        completed iteration is searched first. Any root move that beats it in the current iteration is better at a
+        greater depth, so it is proposed before the iteration completes.
+        @param game_state: The current game state
+        @param all_moves: The moves of the position
+        @param tt_move: The best move of an earlier search of the position, or None
+        @param ply: The distance of the position to the root of the search
+        @return: (list, bool)
+            - list: the moves in the order in which they should be searched
+            - bool: whether the moves that beat the first move should be proposed
+        """
+        all_moves = self.move_ordering.order(game_state.board, all_moves, tt_move, ply)
+        root = ply == 0
+        if root and self.root_best in all_moves:
+            all_moves.remove(self.root_best)
+            all_moves.insert(0, self.root_best)
+        return all_moves, root and all_moves[0] == self.root_best
+
+    def searched_moves(self, game_state: GameState, all_moves):
+        """
+        Play the moves of a position one after the other with play. Only one of the moves that are declared taboo is
+        searched, since they all pass the turn.
+        @param game_state: The current game state
+        @param all_moves: The moves of the position, in the order in which they should be searched
+        @return: A generator of the moves, each of which is played when it is yielded and must be taken back with unplay
+        """
+        passed = False
+        for move in all_moves:
+            if isinstance(self.play(game_state, move), TabooMove):
+                if passed:
+                    self.unplay(game_state)
+                    continue
+                passed = True
+            yield move
+
+    def final_value(self, game_state: GameState, base):
+        """
+        Compute the value of a position without moves.
+        @param game_state: The current game state
+        @param base: The score difference of the position from the perspective of the search, see score_difference
+        @return: The final score difference base if the board is full, or None if the player to move is deadlocked
+        """
+        if not self.hasEmpty(game_state.board):
+            return base
+        return None
+
+    def evaluate_horizon(self, game_state: GameState, meta: Metadata, alpha, beta, curr_player) -> int:
+        """
+        Evaluate a position at the horizon of the search. A fixed depth evaluation misses the points that the player to
+        move can score immediately, so unless quiescence_limit is 0, the evaluation is extended with a quiescence search.
+        @param game_state: The game state to evaluate
+        @param meta: The metadata attached to the current routine and turn computation
+        @param alpha: The current alpha value, from the perspective of curr_player
+        @param beta: The current beta value, from the perspective of curr_player
+        @param curr_player: The player from whose perspective the position is evaluated
+        @return: An evaluation of the input game state
+        """
+        if not self.quiescence_limit:
+            return self.evaluate_state(game_state, meta.last_move, curr_player)
+        self.quiescence_nodes = 0
+        if game_state.current_player() == curr_player:
+            return self.quiescence(game_state, meta, alpha, beta)
+        return -self.quiescence(game_state, meta, -beta, -alpha)
+
+    def quiescence(self, game_state: GameState, meta: Metadata, alpha, beta) -> int:
+        """
+        Search only the scoring moves of a position, until no region can be completed with one move. The player to
+        move may also stand pat, i.e. take the evaluation of the position, since a quiet move is assumed to be
+        available. The search stops at quiescence_limit nodes, and then takes the evaluation of the position as well.
+        @param game_state: The current game state
+        @param meta: The metadata attached to the current routine and turn computation
+        @param alpha: The current alpha value to be considered for pruning
+        @param beta: The current beta value to be considered for pruning
+        @return: The evaluation of the position from the perspective of the player to move
+        """
+        self.nodes += 1
+        self.quiescence_nodes += 1
+        best_value = self.evaluate_state(game_state, meta.last_move, game_state.current_player())
+        if best_value >= beta or self.quiescence_nodes >= self.quiescence_limit:
+            return best_value
+        alpha = max(alpha, best_value)
+
+        board = game_state.board
+        for move in sorted(scoring_moves(game_state), key=lambda move: -immediate_score(board, move)):
+            # A taboo move passes the turn without scoring, so it is not searched
+            if isinstance(self.play(game_state, move), TabooMove):
+                self.unplay(game_state)
+                continue
+            meta.setLast(move)
+            value = -self.quiescence(game_state, meta, -beta, -alpha)
+            self.unplay(game_state)
+            best_value = max(best_value, value)
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+        return best_value
+
+    def endgame_moves(self, game_state: GameState):
+        """
+        Generate all moves of a position from the bitmasks of the candidate cache and the taboo moves.
+        @param game_state: The current game state
+        @return: A list of moves that do not break the rules and are not taboo, in row-major order
+        """
+        N = game_state.board.N
+        taboo_masks = game_state.taboo_masks
+        all_moves = []
+        for k, mask in enumerate(self.candidate_cache.masks):
+            mask &= ~taboo_masks[k]
+            while mask:
+                bit = mask & -mask
+                mask ^= bit
+                all_moves.append(Move(k // N, k % N, bit.bit_length()))
+        return all_moves
+
+    def solve_endgame(self, game_state: GameState) -> (Move, int):
+        """
+        Solve the rest of the game exactly with a negamax search over all moves until the board is full. Of the moves
+        that are declared taboo only one is searched, since they all pass the turn. The value of every solved position
+        is kept in the endgame table, such that positions that are reached again, also in later moves, are not searched
+        again.
+        @param game_state: The current game state
+        @return: (Move, int)
+            - Move: the best move, or a null move if the board is full
+            - int: the final score difference from the perspective of the player to move if both players play the
+              best moves, or -math.inf if the player to move is deadlocked
+        """
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self.report_statistics()
+            if time.monotonic() > self.endgame_stop:
+                raise EndgameTimeout()
+
+        position_key = game_state.position_hash()
+        base = self.score_difference(game_state, game_state.current_player())
+        entry = self.endgame_table.get(position_key)
+        if entry is not None:
+            return entry[1], entry[0] + base
+        if not self.hasEmpty(game_state.board):
+            return Move(-1, -1, -1), base
+
+        best_value = -math.inf
+        all_moves = self.endgame_moves(game_state)
+        best_move = all_moves[0] if all_moves else Move(-1, -1, -1)
+        for move in self.searched_moves(game_state, all_moves):
+            # The solver may give up anywhere in the tree, so the move is always taken back
+            try:
+                value = -self.solve_endgame(game_state)[1]
+            finally:
+                self.unplay(game_state)
+            if value > best_value:
+                best_value = value
+                best_move = move
+
+        if len(self.endgame_table) >= self.endgame_entries:
+            self.endgame_table.clear()
+        self.endgame_table[position_key] = (best_value - base, best_move)
+        return best_move, best_value
+
+    def play(self, game_state: GameState, move: Move) -> Move:
+        """
+        Play a move on the game state, and update the candidate cache accordingly. A move after which the sudoku has no
+        solution is played as a taboo move, like the oracle does: it does not change the board, is not rewarded, and
+        passes the turn. Filling in the only candidate of a square keeps the sudoku solvable, so these forced moves are
+        not checked. The other moves are searched by the solvability checker at the root and in the endgame, where a
+        wrong guess is most expensive, and elsewhere only checked by constraint propagation. If the check is undecided,
+        the move is assumed to be fine.
+        @param game_state: The current game state
+        @param move: A move of the player to move
+        @return: The move that was played, i.e. move or the corresponding TabooMove
+        """
+        if not isinstance(move, TabooMove):
+            N = game_state.board.N
+            k = move.i * N + move.j
+            mask = self.candidate_cache.masks[k]
+            game_state.apply(move)
+            changed = self.candidate_cache.play(move.i, move.j, move.value)
+            if mask & (mask - 1) == 0:
+                return move
+            board = game_state.board
+            search = len(game_state.moves) == self.root_ply + 1 or board.empty_count <= self.endgame_threshold
+            if self.solvability.is_solvable(board, self.candidate_cache.masks, k, changed, search) is not False:
+                return move
+            game_state.undo()
+            self.candidate_cache.unplay()
+            move = TabooMove(move.i, move.j, move.value)
+        game_state.apply(move)
+        return move
+
+    def unplay(self, game_state: GameState) -> None:
+        """
+        Take back the last move that was played with play.
+        @param game_state: The current game state
+        """
+        move = game_state.undo()
+        if not isinstance(move, TabooMove):
+            self.candidate_cache.unplay()
+
+    def report_statistics(self, depth: int = None) -> None:
+        """
+        Report the search statistics of the current move to the game playing framework.
+        @param depth: The depth of the iteration that was just completed, or None during an iteration
+        """
+        table = self.transposition_table
+        self.report_search(self.nodes, depth, table.probes - self.tt_probes_start, table.hits - self.tt_hits_start)
+
+    def store_result(self, key: int, depth: int, value, move: Move, alpha, beta, base) -> None:
+        """
+        Store the result of the search of a position in the transposition table.
+        @param key: The hash of the position
+        @param depth: The depth of the search
+        @param value: The value found by the search
+        @param move: The best move found by the search
+        @param alpha: The alpha value with which the search of the position started
+        @param beta: The beta value with which the search of the position started
+        @param base: The score difference of the position, see score_difference
+        """
+        if value <= alpha:
+            bound = UPPER
+        elif value >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.transposition_table.store(key, depth, value - base, bound, move)
+
+    @staticmethod
+    def score_difference(game_state: GameState, curr_player) -> int:
+        """
+        Compute how many points the player curr_player is ahead of the other player.
+        @param game_state: The current state of the game
+        @param curr_player: The player for which to compute the difference
+        @return: The difference between the scores of the player curr_player and the other player
+        """
+        difference = diff_score(game_state.scores)
+        return difference if curr_player == 1 else -difference
+
     def evaluate_state(self, game_state: GameState, last_move: Move, curr_player) -> int:
         """
         Evaluates the current state of the game.
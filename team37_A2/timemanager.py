@@ -0,0 +1,73 @@
+import time
+
+
+class TimeManager(object):
+    """A TimeManager decides whether another iteration of the iterative deepening can be completed before the deadline.
+    The cost of the next iteration is estimated from the number of nodes of the last iteration, the effective branching
+    factor of the last two iterations and the node rate of the search so far."""
+
+    def __init__(self, remaining_time: float, safety: float = 1.2):
+        """
+        Starts the clock for the current move.
+        @param remaining_time: The time in seconds that is left for the current move, math.inf if unknown
+        @param safety: The factor by which the estimated time of an iteration is multiplied
+        """
+        self.start = time.monotonic()
+        self.end = self.start + remaining_time
+        self.safety = safety
+        self.iteration_nodes = []
+
+    def elapsed(self) -> float:
+        """
+        @return: The time in seconds since the clock was started
+        """
+        return time.monotonic() - self.start
+
+    def remaining(self) -> float:
+        """
+        @return: The time in seconds until the deadline
+        """
+        return self.end - time.monotonic()
+
+    def finish_iteration(self, nodes: int) -> None:
+        """
+        Record the number of nodes of a completed iteration.
+        @param nodes: The number of nodes searched by the iteration
+        """
+        self.iteration_nodes.append(nodes)
+
+    def branching_factor(self) -> float:
+        """
+        Compute the effective branching factor, i.e. the growth of the number of nodes from one iteration to the next.
+        @return: The ratio of the number of nodes of the last two iterations, at least 1
+        """
+        if len(self.iteration_nodes) < 2 or self.iteration_nodes[-2] == 0:
+            return 1.0
+        return max(1.0, self.iteration_nodes[-1] / self.iteration_nodes[-2])
+
+    def node_rate(self, total_nodes: int) -> float:
+        """
+        @param total_nodes: The total number of nodes searched for the current move
+        @return: The number of nodes per second searched for the current move
+        """
+        elapsed = self.elapsed()
+        return total_nodes / elapsed if elapsed > 0 else 0.0
+
+    def estimate_next_iteration(self, total_nodes: int) -> float:
+        """
+        Estimate the time of the next iteration.
+        @param total_nodes: The total number of nodes searched for the current move
+        @return: The estimated time in seconds
+        """
+        rate = self.node_rate(total_nodes)
+        if not self.iteration_nodes or rate == 0:
+            return 0.0
+        return self.iteration_nodes[-1] * self.branching_factor() / rate
+
+    def can_complete_next_iteration(self, total_nodes: int) -> bool:
+        """
+        Check whether the next iteration is expected to complete before the deadline.
+        @param total_nodes: The total number of nodes searched for the current move
+        @return: False if the next iteration is expected to be interrupted
+        """
+        return self.safety * self.estimate_next_iteration(total_nodes) < self.remaining()
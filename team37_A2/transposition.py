@@ -0,0 +1,58 @@
+EXACT = 0  # The stored value is the exact value of the position
+LOWER = 1  # The stored value is a lower bound of the value of the position (the search failed high)
+UPPER = 2  # The stored value is an upper bound of the value of the position (the search failed low)
+
+
+class TranspositionTable(object):
+    """A TranspositionTable maps position hashes to the results of earlier searches of these positions. An entry is a
+    tuple (depth, value, bound, best_move). The number of entries is bounded, such that memory usage is capped."""
+
+    def __init__(self, max_entries: int = 1 << 18):
+        """
+        Constructs an empty transposition table.
+        @param max_entries: The maximum number of entries that are kept in the table
+        """
+        self.max_entries = max_entries
+        self.entries = {}
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key: int):
+        """
+        Look up the entry of a position.
+        @param key: The hash of the position
+        @return: The tuple (depth, value, bound, best_move) that was stored for the position, or None
+        """
+        self.probes += 1
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def store(self, key: int, depth: int, value, bound: int, best_move) -> None:
+        """
+        Store the result of a search of a position. An existing entry of the position is only replaced by a search that
+        is at least as deep. If the table is full, the oldest entry is evicted to make room for a new position.
+        @param key: The hash of the position
+        @param depth: The depth of the search
+        @param value: The value found by the search
+        @param bound: Whether the value is EXACT, a LOWER bound or an UPPER bound
+        @param best_move: The best move found by the search
+        """
+        entries = self.entries
+        entry = entries.get(key)
+        if entry is not None:
+            if entry[0] > depth:
+                return
+        elif len(entries) >= self.max_entries:
+            # Dictionaries keep their insertion order, so the first key is the oldest entry
+            del entries[next(iter(entries))]
+        entries[key] = (depth, value, bound, best_move)
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the table.
+        """
+        self.entries.clear()
+        self.probes = 0
+        self.hits = 0
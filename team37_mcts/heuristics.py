@@ -0,0 +1,39 @@
+import functools
+
+from competitive_sudoku.sudoku import GameState
+
+
+def completion_score(row_empty, column_empty, block_empty, i, j, b) -> int:
+    """
+    Calculate the score of a move from the numbers of empty squares of its regions, like GameState.apply does for a
+    board.
+    @param row_empty: The number of empty squares of every row, including the filled entry of the move
+    @param column_empty: The number of empty squares of every column, including the filled entry of the move
+    @param block_empty: The number of empty squares of every block, including the filled entry of the move
+    @param i: The row of the move
+    @param j: The column of the move
+    @param b: The block of the move
+    @return: the score that the move gives
+    """
+    return GameState.region_scores[(row_empty[i] == 0) + (column_empty[j] == 0) + (block_empty[b] == 0)]
+
+
+def diff_score(scores) -> int:
+    """
+    Compute the difference in score between player 1 and player 2.
+    @param scores: The list of scores (size = 2)
+    @return: The difference between the scores in the input list
+    """
+    return scores[0] - scores[1]
+
+
+@functools.lru_cache(maxsize=None)
+def square_blocks(m: int, n: int):
+    """
+    Compute the block of every square.
+    @param m: The number of rows of a block
+    @param n: The number of columns of a block
+    @return: A tuple with for every square index k = i * N + j the index of its block, see SudokuBoard.block_index
+    """
+    N = m * n
+    return tuple((i // m) * m + j // n for i in range(N) for j in range(N))
@@ -0,0 +1,148 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import math
+import random
+
+from competitive_sudoku.sudoku import GameState, Move, SudokuBoard, mask_values
+import competitive_sudoku.sudokuai
+from team37_mcts.heuristics import completion_score, diff_score, square_blocks
+from team37_mcts.tree import Node
+
+
+class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
+    """
+    Sudoku AI that computes a move for a given sudoku configuration with Monte Carlo tree search. Every iteration
+    selects a path through the tree with UCT, adds one node, and finishes the game with a random playout. Unlike an
+    alpha-beta search, an iteration does not get more expensive on larger boards, so the search scales to 3x4 and 4x4.
+    """
+    def __init__(self, exploration: float = math.sqrt(2), proposal_interval: int = 128):
+        """
+        @param exploration: The exploration constant of UCT
+        @param proposal_interval: The number of iterations after which the most visited move is proposed again
+        """
+        super().__init__()
+        self.exploration = exploration
+        self.proposal_interval = proposal_interval
+
+    @staticmethod
+    def untried_moves(game_state: GameState):
+        """
+        Gets the moves of a position, in the format of Node.untried.
+        @param game_state: The current state of the game
+        @return: A list of pairs [k, mask] with the candidate values of every empty square that has any
+        """
+        N = game_state.board.N
+        untried = []
+        for k in range(N * N):
+            mask = game_state.candidates(k // N, k % N)
+            if mask:
+                untried.append([k, mask])
+        return untried
+
+    def compute_best_move(self, game_state: GameState) -> None:
+        """
+        Run iterations of the Monte Carlo tree search until the deadline, and regularly propose the most visited move of
+        the root, such that the search can be interrupted at any time.
+        @param game_state: The initial game state to calculate a move on.
+        """
+        N = game_state.board.N
+        root = Node(None, None, None, self.untried_moves(game_state))
+        if not root.untried:
+            return
+        # Propose a random move, so some move is always returned
+        k, mask = random.choice(root.untried)
+        proposal = Move(k // N, k % N, random.choice(mask_values(mask)))
+        self.propose_move(proposal)
+        if len(root.untried) == 1 and mask & (mask - 1) == 0:
+            self.propose_final_move(Move(k // N, k % N, mask.bit_length()))
+            return
+
+        iterations = 0
+        max_depth = 0
+        while self.remaining_time() > 0:
+            max_depth = max(max_depth, self.iterate(root, game_state))
+            iterations += 1
+            if iterations % self.proposal_interval == 0:
+                best_move = root.most_visited().move
+                if best_move != proposal:
+                    self.propose_move(best_move)
+                    proposal = best_move
+                self.report_search(iterations, max_depth)
+        # The deadline may pass before the first iteration completes, then the fallback move stays proposed
+        if root.children:
+            self.propose_move(root.most_visited().move)
+
+    def iterate(self, root: Node, game_state: GameState) -> int:
+        """
+        Perform one iteration of the search: select a path with UCT, expand a new node, finish the game with a random
+        playout, and update the statistics of the nodes on the path.
+        @param root: The root of the search tree
+        @param game_state: The game state of the root, it is restored afterwards
+        @return: The depth of the new node
+        """
+        node = root
+        depth = 0
+        while not node.untried and node.children:
+            node = node.select_child(self.exploration)
+            game_state.apply(node.move)
+            depth += 1
+        if node.untried:
+            player = len(game_state.moves) % 2
+            move = node.pop_untried(game_state.board.N)
+            game_state.apply(move)
+            child = Node(move, node, player, self.untried_moves(game_state))
+            node.children.append(child)
+            node = child
+            depth += 1
+
+        difference = diff_score(game_state.scores) + self.playout(game_state)
+        for _ in range(depth):
+            game_state.undo()
+
+        while node is not None:
+            node.visits += 1
+            if node.player is not None:
+                if difference == 0:
+                    node.wins += 0.5
+                elif (difference > 0) == (node.player == 0):
+                    node.wins += 1
+            node = node.parent
+        return depth
+
+    @staticmethod
+    def playout(game_state: GameState) -> int:
+        """
+        Finish the game with random moves on a copy of the region masks and counts of the board. The empty squares are
+        filled in a random order with a random value that does not break the rules, and a square in which no value
+        fits is left empty. The moves are scored like GameState.apply scores them.
+        @param game_state: The current state of the game, it is not modified
+        @return: The difference between the scores of the first and the second player in the playout
+        """
+        board = game_state.board
+        N = board.N
+        blocks = square_blocks(board.m, board.n)
+        full_mask = board.full_mask
+        row_masks, column_masks, block_masks = list(board.row_masks), list(board.column_masks), list(board.block_masks)
+        row_empty, column_empty, block_empty = list(board.row_empty), list(board.column_empty), list(board.block_empty)
+        empties = [k for k, value in enumerate(board.squares) if value == SudokuBoard.empty]
+        random.shuffle(empties)
+
+        scores = [0, 0]
+        player = len(game_state.moves) % 2
+        for k in empties:
+            i, j, b = k // N, k % N, blocks[k]
+            mask = full_mask & ~(row_masks[i] | column_masks[j] | block_masks[b])
+            if not mask:
+                continue
+            bit = 1 << (random.choice(mask_values(mask)) - 1)
+            row_masks[i] |= bit
+            column_masks[j] |= bit
+            block_masks[b] |= bit
+            row_empty[i] -= 1
+            column_empty[j] -= 1
+            block_empty[b] -= 1
+            scores[player] += completion_score(row_empty, column_empty, block_empty, i, j, b)
+            player ^= 1
+        return scores[0] - scores[1]
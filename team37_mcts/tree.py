@@ -0,0 +1,63 @@
+import math
+import random
+
+from competitive_sudoku.sudoku import Move, mask_values
+
+
+class Node(object):
+    """A Node is a position in the search tree. It keeps the statistics of the playouts through the position, and the
+    moves of the position that have not been expanded yet, as a list of pairs [k, mask] of a square index
+    k = i * N + j and the bitmask of its values that have not been expanded."""
+
+    def __init__(self, move, parent, player, untried):
+        """
+        Constructs a node without children.
+        @param move: The move that leads from the parent to this node, None for the root
+        @param parent: The parent node, None for the root
+        @param player: The player that played move, 0 for the first and 1 for the second player, None for the root
+        @param untried: The moves of the position, as a list of pairs [k, mask]
+        """
+        self.move = move
+        self.parent = parent
+        self.player = player
+        self.untried = untried
+        self.children = []
+        self.visits = 0
+        self.wins = 0.0
+
+    def select_child(self, exploration: float):
+        """
+        Select the child with the highest upper confidence bound (UCT).
+        @param exploration: The exploration constant
+        @return: The selected child
+        """
+        log_visits = math.log(self.visits)
+        return max(self.children,
+                   key=lambda child: child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits))
+
+    def pop_untried(self, N: int) -> Move:
+        """
+        Remove a random move from the moves that have not been expanded. A square is chosen uniformly, and then one of
+        its values, such that squares with many candidates do not dominate the search.
+        @param N: The size of the board
+        @return: The move
+        """
+        untried = self.untried
+        index = random.randrange(len(untried))
+        k, mask = untried[index]
+        value = random.choice(mask_values(mask))
+        mask &= ~(1 << (value - 1))
+        if mask:
+            untried[index][1] = mask
+        else:
+            untried[index] = untried[-1]
+            untried.pop()
+        return Move(k // N, k % N, value)
+
+    def most_visited(self):
+        """
+        @return: The child with the most visits, which is the most reliable choice, or None if there are no children
+        """
+        if not self.children:
+            return None
+        return max(self.children, key=lambda child: child.visits)
@@ -0,0 +1,55 @@
+import copy
+import random
+import unittest
+
+from competitive_sudoku.sudoku import GameState, SudokuBoard
+from team37_A2.candidates import CandidateCache
+from team37_A2.solvability import SolvabilityChecker
+from team37_A2.sudokuai import SudokuAI, EndgameTimeout
+
+
+def endgame_position(m: int, n: int, empty: int, seed: int) -> GameState:
+    """
+    Creates a position in which the given number of squares of a solved sudoku are empty.
+    """
+    board = SudokuBoard(m, n)
+    N = board.N
+    checker = SolvabilityChecker(m, n, budget=1 << 20)
+    solution = checker.solve(list(board.squares), list(CandidateCache(board).masks))
+    for k, value in enumerate(solution):
+        board.put(k // N, k % N, value)
+    for k in random.Random(seed).sample(range(N * N), empty):
+        board.put(k // N, k % N, SudokuBoard.empty)
+    return GameState(board, copy.deepcopy(board), [], [], [0, 0])
+
+
+class EndgameTest(unittest.TestCase):
+    def test_timeout_restores_the_position(self):
+        game_state = endgame_position(3, 3, 10, seed=1)
+        board = game_state.board
+        player = SudokuAI()
+        player.root_ply = len(game_state.moves)
+        player.candidate_cache = CandidateCache(board)
+        player.solvability = SolvabilityChecker(board.m, board.n)
+        squares = list(board.squares)
+        masks = list(player.candidate_cache.masks)
+        key = game_state.position_hash()
+
+        # give up at the 1024th node, deep inside the tree
+        player.endgame_stop = 0
+        player.nodes = 1000
+        with self.assertRaises(EndgameTimeout):
+            player.solve_endgame(game_state)
+
+        self.assertEqual(board.squares, squares)
+        self.assertEqual(board.empty_count, 10)
+        self.assertEqual(game_state.moves, [])
+        self.assertEqual(game_state.taboo_moves, [])
+        self.assertEqual(game_state.scores, [0, 0])
+        self.assertEqual(game_state.position_hash(), key)
+        self.assertEqual(player.candidate_cache.masks, masks)
+        self.assertEqual(player.candidate_cache.undo_stack, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from competitive_sudoku import oracle
+from competitive_sudoku.sudoku import load_sudoku_from_text, SudokuBoard
+
+# A 4x4 position of a game between random players without a solution. The backtracking solver without propagation
+# did not finish it within a minute.
+UNSOLVABLE_4X4 = """\
+4 4
+   .   .  10   .   .   7   .   .   .   2   .   .   .   .   .   .
+   .   .   6   .   2   .   .   .   8   .  10   .   .   .   .   .
+   .   .   .   .   .   .  15   .  16   .  14   .   .   6   .   .
+   .   .   .   .   .  12   .   .   .   .   .   .   .  13   .   .
+   .   .   .   .   .   5   .   .   .   .   .   7   .   .   3   .
+   .   3   .  14   .   .   6   .   .   .   .  12   .   .   .   .
+   .  10   .   .   .   3   .   .   .   .   .   .   4   .  11   .
+   .   .   .   .   .   2   .   .  14   .   .  13   .   7  10   .
+   .   .   .   2   .   .  12   9   .   .   .   .   .   5   .   .
+   .   .   .   .   7  15   .   .   .   .   .   .   .   .   .   9
+   .   .  15   .   5   .   .   6   .   .   3   .   .   .   8   .
+   .   .   8   .   .  10   .   .   7   .   .   .   .   .   .   .
+   .   .   4   .   .   .   .   .   .   .   .   .   .   .   .   .
+   .   .   .   .   6   .   .   .   .   .   .   .   .   .   .   .
+   9   .  12   7   .   .   .   .   .   .   .   .   .   .   6   4
+   .   .   .   .   .   .   5   .   .   .   .   .   .   .   .   .
+"""
+
+
+class OracleTest(unittest.TestCase):
+    def setUp(self):
+        oracle._known_solutions.clear()
+
+    def test_unsolvable_position(self):
+        board = load_sudoku_from_text(UNSOLVABLE_4X4)
+        self.assertIsNone(oracle.solve(board))
+        self.assertFalse(oracle.has_solution(board))
+
+    def test_solution_completes_the_board(self):
+        board = load_sudoku_from_text(UNSOLVABLE_4X4)
+        # without the 6 at (13, 4), the position has a solution
+        board.put(13, 4, SudokuBoard.empty)
+        givens = list(board.squares)
+        solution = oracle.solve(board)
+        self.assertIsNotNone(solution)
+        for k, value in enumerate(solution):
+            self.assertTrue(givens[k] == SudokuBoard.empty or givens[k] == value)
+            board.put(k // board.N, k % board.N, value)
+        self.assertEqual(board.empty_count, 0)
+        self.assertTrue(oracle.is_consistent(board))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import math
+import unittest
+
+from competitive_sudoku.ratings import ELO_SCALE, elo_difference, expected_score, fit_ratings, sprt_bounds, sprt_llr
+
+
+def games(wins: int, draws: int, losses: int):
+    """
+    Creates the results of games of player A against player B.
+    """
+    return [('A', 'B', 1.0)] * wins + [('A', 'B', 0.5)] * draws + [('A', 'B', 0.0)] * losses
+
+
+class RatingsTest(unittest.TestCase):
+    def test_expected_score(self):
+        self.assertAlmostEqual(expected_score(0), 0.5)
+        self.assertAlmostEqual(expected_score(400), 10 / 11)
+        self.assertAlmostEqual(elo_difference(expected_score(123)), 123)
+
+    def test_fit_ratings(self):
+        # 3 wins out of 4 give a strength ratio of 3, i.e. a difference of 400 * log10(3) = 190.8 Elo
+        ratings = fit_ratings(games(3, 0, 1), prior=0)
+        self.assertAlmostEqual(ratings['A'][0], 200 * math.log10(3), places=6)
+        self.assertAlmostEqual(ratings['B'][0], -200 * math.log10(3), places=6)
+
+        # the prior adds 2 draws, which gives 4 points out of 6 and a strength ratio of 2
+        ratings = fit_ratings(games(3, 0, 1))
+        self.assertAlmostEqual(ratings['A'][0], 200 * math.log10(2), places=6)
+        # the information of 6 games at a ratio of 2 is 6 * 2 / 3 ** 2
+        self.assertAlmostEqual(ratings['A'][1], 1.96 * ELO_SCALE / math.sqrt(4 / 3), places=6)
+
+        ratings = fit_ratings(games(2, 2, 2))
+        self.assertAlmostEqual(ratings['A'][0], 0, places=6)
+        self.assertEqual(fit_ratings([]), {})
+
+    def test_sprt(self):
+        lower, upper = sprt_bounds(0.05, 0.05)
+        self.assertAlmostEqual(lower, math.log(0.05 / 0.95))
+        self.assertAlmostEqual(upper, math.log(0.95 / 0.05))
+
+        # 60 wins, 20 draws and 20 losses: a score of 0.7 with a variance of 0.6 + 0.2 / 4 - 0.7 ** 2 = 0.16
+        s1 = 1 / (1 + 10 ** (-10 / 400))
+        self.assertAlmostEqual(sprt_llr(60, 20, 20, 0, 10), (s1 - 0.5) * (1.4 - 0.5 - s1) / (2 * 0.16 / 100))
+        self.assertAlmostEqual(sprt_llr(60, 20, 20, 0, 10), 1.7337, places=4)
+        # an even result is evidence for H0
+        self.assertLess(sprt_llr(50, 0, 50, 0, 10), 0)
+        self.assertEqual(sprt_llr(0, 0, 0, 0, 10), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
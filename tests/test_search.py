@@ -0,0 +1,40 @@
+import math
+import unittest
+
+from competitive_sudoku.sudoku import Move
+from team37_A2.candidates import CandidateCache
+from team37_A2.metadata import Metadata
+from team37_A2.solvability import SolvabilityChecker
+from team37_A2.sudokuai import SudokuAI
+from tests.test_endgame import endgame_position
+
+
+class SearchTest(unittest.TestCase):
+    def search(self, game_state, search: str):
+        """
+        Searches a position to the end of the game with alphabeta or pvs.
+        @return: The value from the perspective of the player to move
+        """
+        board = game_state.board
+        player = SudokuAI()
+        player.root_ply = len(game_state.moves)
+        player.root_best = Move(-1, -1, -1)
+        player.candidate_cache = CandidateCache(board)
+        player.solvability = SolvabilityChecker(board.m, board.n)
+        meta = Metadata(Move(-1, -1, -1), None, -math.inf)
+        if search == 'pvs':
+            return player.pvs(game_state, meta, board.empty_count, -math.inf, math.inf)[1]
+        return player.alphabeta(game_state, meta, True, board.empty_count, -math.inf, math.inf,
+                                game_state.current_player())[1]
+
+    def test_terminal_values_of_the_second_player(self):
+        for seed in range(4):
+            game_state = endgame_position(2, 2, 3, seed)
+            # the second player is to move, and behind
+            game_state.moves.append(Move(-1, -1, -1))
+            game_state.scores = [5, 0]
+            self.assertEqual(self.search(game_state, 'alphabeta'), self.search(game_state, 'pvs'))
+
+
+if __name__ == '__main__':
+    unittest.main()
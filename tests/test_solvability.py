@@ -0,0 +1,50 @@
+import random
+import unittest
+
+from competitive_sudoku import oracle
+from competitive_sudoku.sudoku import SudokuBoard
+from team37_A2.candidates import CandidateCache
+from team37_A2.solvability import SolvabilityChecker
+
+
+class SolvabilityTest(unittest.TestCase):
+    def check_random_game(self, m: int, n: int, seed: int, search: bool) -> None:
+        """
+        Fills in random candidates until the board is full, and compares every incremental check with the oracle.
+        Moves after which the board has no solution are taken back, like taboo moves.
+        """
+        rnd = random.Random(seed)
+        board = SudokuBoard(m, n)
+        N = board.N
+        cache = CandidateCache(board)
+        checker = SolvabilityChecker(m, n, budget=1 << 20)
+        taboo = set()
+        while board.empty_count:
+            moves = [(k, value) for k, mask in enumerate(cache.masks) for value in range(1, N + 1)
+                     if mask & (1 << (value - 1)) and (k, value) not in taboo]
+            if not moves:
+                # an undecided check let an unsolvable board through
+                break
+            k, value = rnd.choice(moves)
+            board.put(k // N, k % N, value)
+            changed = cache.play(k // N, k % N, value)
+            result = checker.is_solvable(board, cache.masks, k, changed, search)
+            if search or result is not None:
+                self.assertEqual(result, oracle.solve(board) is not None)
+            if result is False:
+                board.put(k // N, k % N, SudokuBoard.empty)
+                cache.unplay()
+                taboo.add((k, value))
+
+    def test_search(self):
+        for seed in range(4):
+            self.check_random_game(2, 3, seed, search=True)
+            self.check_random_game(3, 3, seed, search=True)
+
+    def test_propagation(self):
+        for seed in range(4):
+            self.check_random_game(3, 3, seed, search=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
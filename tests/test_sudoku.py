@@ -0,0 +1,124 @@
+import copy
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+from competitive_sudoku.sudoku import GameState, Move, SudokuBoard, TabooMove, load_sudoku_from_text
+
+EASY_2X2 = '''2 2
+   1   2   3   .
+   3   4   1   2
+   2   1   .   3
+   .   3   .   1
+'''
+
+
+def empty_game_state(m: int, n: int) -> GameState:
+    """
+    Creates the game state at the start of a game on an empty board.
+    """
+    board = SudokuBoard(m, n)
+    return GameState(board, copy.deepcopy(board), [], [], [0, 0])
+
+
+def game_state_from_text(text: str) -> GameState:
+    """
+    Creates the game state at the start of a game on the board of a text.
+    """
+    board = load_sudoku_from_text(text)
+    return GameState(board, copy.deepcopy(board), [], [], [0, 0])
+
+
+def snapshot(game_state: GameState):
+    """
+    Copies everything that apply and undo change.
+    """
+    board = game_state.board
+    return (list(board.squares), list(board.row_masks), list(board.column_masks), list(board.block_masks),
+            list(board.row_empty), list(board.column_empty), list(board.block_empty), board.empty_count, board.zobrist,
+            list(game_state.moves), list(game_state.taboo_moves), list(game_state.taboo_masks), list(game_state.scores),
+            game_state.position_hash())
+
+
+class ApplyUndoTest(unittest.TestCase):
+    def test_round_trip(self):
+        game_state = game_state_from_text(EASY_2X2)
+        before = snapshot(game_state)
+        moves = [TabooMove(2, 2, 2), Move(0, 3, 4), Move(3, 0, 4)]
+
+        self.assertEqual(game_state.apply(moves[0]), 0)
+        self.assertTrue(game_state.is_taboo(2, 2, 2))
+        self.assertEqual(game_state.apply(moves[1]), 7)  # completes a row, a column and a block
+        self.assertEqual(game_state.apply(moves[2]), 3)  # completes a column and a block
+        self.assertEqual(game_state.scores, [3, 7])
+        self.assertEqual(game_state.board.empty_count, 2)
+        self.assertEqual(game_state.moves, moves)
+
+        for move in reversed(moves):
+            self.assertEqual(game_state.undo(), move)
+        self.assertEqual(snapshot(game_state), before)
+
+
+class PositionHashTest(unittest.TestCase):
+    def play(self, moves) -> GameState:
+        game_state = empty_game_state(2, 2)
+        for move in moves:
+            game_state.apply(move)
+        return game_state
+
+    def test_transpositions(self):
+        moves = [Move(0, 0, 1), TabooMove(1, 1, 1), Move(3, 3, 2), Move(2, 1, 4)]
+        transposed = [Move(2, 1, 4), Move(3, 3, 2), TabooMove(1, 1, 1), Move(0, 0, 1)]
+        self.assertEqual(self.play(moves).position_hash(), self.play(transposed).position_hash())
+
+        # the same board with the other player to move, or without the taboo move, is another position
+        other_side = self.play(moves)
+        other_side.moves.append(Move(-1, -1, -1))
+        self.assertNotEqual(other_side.position_hash(), self.play(moves).position_hash())
+        no_taboo = self.play(moves)
+        no_taboo.remove_taboo_move(TabooMove(1, 1, 1))
+        self.assertNotEqual(no_taboo.position_hash(), self.play(moves).position_hash())
+
+    def test_board_hash_does_not_depend_on_the_history(self):
+        game_state = game_state_from_text(EASY_2X2)
+        board = SudokuBoard(2, 2)
+        for k, value in enumerate(game_state.board.squares):
+            board.put(k // 4, k % 4, value)
+        self.assertEqual(board.zobrist, game_state.board.zobrist)
+        self.assertNotEqual(board.zobrist, 0)
+
+    def test_stable_across_processes(self):
+        code = ('from competitive_sudoku.sudoku import load_sudoku_from_text; '
+                'import sys; print(load_sudoku_from_text(sys.stdin.read()).zobrist)')
+        output = subprocess.run([sys.executable, '-c', code], input=EASY_2X2, capture_output=True, text=True, check=True,
+                                cwd=Path(__file__).resolve().parent.parent)
+        self.assertEqual(int(output.stdout), game_state_from_text(EASY_2X2).board.zobrist)
+
+
+class TabooMovesTest(unittest.TestCase):
+    def test_duplicate_taboo_moves(self):
+        game_state = empty_game_state(2, 2)
+        expected = empty_game_state(2, 2)
+        expected.taboo_moves = [TabooMove(0, 1, 3), Move(2, 0, 4)]
+
+        game_state.taboo_moves = [TabooMove(0, 1, 3), Move(2, 0, 4), TabooMove(0, 1, 3)]
+        self.assertTrue(game_state.is_taboo(0, 1, 3))
+        self.assertTrue(game_state.is_taboo(2, 0, 4))
+        self.assertEqual(game_state.taboo_masks, expected.taboo_masks)
+        self.assertEqual(game_state.position_hash(), expected.position_hash())
+
+        # one copy of the move is left
+        game_state.remove_taboo_move(TabooMove(0, 1, 3))
+        self.assertTrue(game_state.is_taboo(0, 1, 3))
+        self.assertEqual(game_state.position_hash(), expected.position_hash())
+
+    def test_add_taboo_move_twice(self):
+        game_state = empty_game_state(2, 2)
+        game_state.add_taboo_move(TabooMove(0, 1, 3))
+        with self.assertRaises(AssertionError):
+            game_state.add_taboo_move(TabooMove(0, 1, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()